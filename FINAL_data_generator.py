@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
-import json
 import csv
 import os
+import sys
+import time
+import heapq
 import random
 import datetime
+import functools
 import string
-from typing import List, Dict, Any, Union, Tuple
+from collections import deque
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Union, Tuple
 import uuid
 
+from arbore_codec import dump_lines, dump_records
+from arbore_profiling import batch_done, pop_profile_options
+
 # Create output directories
 os.makedirs("data_out/orders", exist_ok=True)
 os.makedirs("data_out/claims", exist_ok=True)
@@ -19,6 +27,19 @@ NUM_CLAIMS = 300     # 300 warranty claims
 NUM_SUPPLIERS = 20
 DUPLICATE_RATE = 0.02  # 2% duplicates
 
+# Replay mode (--replay): live feed of orders and follow-up claims
+REPLAY_START_DATE = datetime.date(2024, 1, 1)
+REPLAY_WINDOW_DAYS = 730                        # the business clock wraps back to the start date after this
+REPLAY_ORDERS_PER_DAY = NUM_ORDERS / REPLAY_WINDOW_DAYS  # same density as the batch files
+REPLAY_CLAIM_RATE = NUM_CLAIMS / NUM_ORDERS     # share of orders that get a claim later
+REPLAY_PROFILES = ("steady", "ramp", "burst")
+BURST_FACTOR = 5            # burst profile: 5x the rate...
+BURST_SECONDS = 1.0         # ...for 1 second...
+BURST_PERIOD_SECONDS = 10.0  # ...every 10 seconds
+RAMP_SECONDS = 60.0         # ramp profile without --duration: full rate after 60s
+BUCKET_SECONDS = 0.1        # token bucket holds at most 100ms of events
+MAX_CHUNK = 10000           # events written per write() call
+
 # Helper functions
 def random_date(start_date: datetime.date, end_date: datetime.date) -> datetime.date:
     """Generate a random date between start_date and end_date"""
@@ -26,16 +47,20 @@ def random_date(start_date: datetime.date, end_date: datetime.date) -> datetime.
     random_days = random.randrange(delta.days)
     return start_date + datetime.timedelta(days=random_days)
 
+@functools.lru_cache(maxsize=4096)
+def date_variants(date: datetime.date) -> Tuple[str, ...]:
+    """All the ways format_date_with_error() can write a date (cached: replay reuses each date many times)"""
+    return (
+        date.strftime("%Y-%m-%d"),
+        date.strftime("%d/%m/%Y"),
+        date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        date.strftime("%d-%m-%Y"),
+        date.strftime("%m/%d/%Y")
+    )
+
 def format_date_with_error(date: datetime.date) -> str:
     """Format date with possible format errors"""
-    formats = [
-        lambda d: d.strftime("%Y-%m-%d"),
-        lambda d: d.strftime("%d/%m/%Y"),
-        lambda d: d.strftime("%Y-%m-%dT%H:%M:%SZ"),
-        lambda d: d.strftime("%d-%m-%Y"),
-        lambda d: d.strftime("%m/%d/%Y")
-    ]
-    return random.choice(formats)(date)
+    return random.choice(date_variants(date))
 
 def introduce_typo(text: str, probability: float = 0.1) -> str:
     """Introduce typos with given probability"""
@@ -146,6 +171,25 @@ def generate_severity_levels() -> List[str]:
     
     return result
 
+def make_order(i: int, order_date: datetime.date, product_ids: List[str], customer_ids: List[str]) -> Dict:
+    """Build the i-th order with dirty data"""
+    # Sometimes missing prefix
+    order_id = f"O{str(i + 100001).zfill(6)}" if random.random() > 0.05 else f"{str(i + 100001).zfill(6)}"
+    
+    # Sometimes as text
+    quantity = random.randint(1, 5)
+    if random.random() < 0.1:
+        quantity = random.choice(["one", "two", "three", "four", "five"])
+    
+    return {
+        "order_id": order_id,
+        "customer_id": maybe_null(random.choice(customer_ids), 0.05),
+        "product_id": maybe_case_change(random.choice(product_ids), 0.3),
+        "quantity": quantity,
+        "order_date": format_date_with_error(order_date),
+        "order_notes": maybe_null("Standard delivery", 0.2)
+    }
+
 def generate_orders(count: int, product_ids: List[str], customer_ids: List[str]) -> List[Dict]:
     """Generate orders with dirty data"""
     orders = []
@@ -154,25 +198,7 @@ def generate_orders(count: int, product_ids: List[str], customer_ids: List[str])
     
     for i in range(count):
         order_date = random_date(start_date, end_date)
-        
-        # Sometimes missing prefix
-        order_id = f"O{str(i + 100001).zfill(6)}" if random.random() > 0.05 else f"{str(i + 100001).zfill(6)}"
-        
-        # Sometimes as text
-        quantity = random.randint(1, 5)
-        if random.random() < 0.1:
-            quantity = random.choice(["one", "two", "three", "four", "five"])
-        
-        order = {
-            "order_id": order_id,
-            "customer_id": maybe_null(random.choice(customer_ids), 0.05),
-            "product_id": maybe_case_change(random.choice(product_ids), 0.3),
-            "quantity": quantity,
-            "order_date": format_date_with_error(order_date),
-            "order_notes": maybe_null("Standard delivery", 0.2)
-        }
-        
-        orders.append(order)
+        orders.append(make_order(i, order_date, product_ids, customer_ids))
     
     # Add duplicates
     duplicate_count = int(count * DUPLICATE_RATE)
@@ -183,6 +209,54 @@ def generate_orders(count: int, product_ids: List[str], customer_ids: List[str])
     
     return orders
 
+def parse_order_date(text: str) -> datetime.date:
+    """Parse an order date regardless of format (today when it cannot be parsed)"""
+    try:
+        if "/" in text:
+            parts = text.split("/")
+            if len(parts[0]) == 4:  # YYYY/MM/DD
+                return datetime.datetime.strptime(text, "%Y/%m/%d").date()
+            else:  # DD/MM/YYYY
+                return datetime.datetime.strptime(text, "%d/%m/%Y").date()
+        elif "-" in text:
+            if "T" in text:  # ISO format
+                return datetime.datetime.fromisoformat(text.replace("Z", "+00:00")).date()
+            else:
+                parts = text.split("-")
+                if len(parts[0]) == 4:  # YYYY-MM-DD
+                    return datetime.datetime.strptime(text, "%Y-%m-%d").date()
+                else:  # DD-MM-YYYY
+                    return datetime.datetime.strptime(text, "%d-%m-%Y").date()
+        else:
+            # Default to current date if parsing fails
+            return datetime.date.today()
+    except:
+        return datetime.date.today()
+
+def random_return_date(order_date: datetime.date) -> datetime.date:
+    """Return date after the order date (sometimes before it, as an error)"""
+    if random.random() < 0.05:
+        # Return date before order date (error)
+        days_before = random.randint(1, 30)
+        return order_date - datetime.timedelta(days=days_before)
+    else:
+        # Normal return date after order date
+        days_after = random.randint(1, 365)
+        return order_date + datetime.timedelta(days=days_after)
+
+def make_claim(i: int, order: Dict, order_date: datetime.date, return_date: datetime.date) -> Dict:
+    """Build the i-th warranty claim for an order with dirty data"""
+    return {
+        "claim_id": f"R{str(i + 200001).zfill(6)}",
+        "order_id": order["order_id"],
+        "product_id": maybe_case_change(order["product_id"], 0.5),
+        "order_date": format_date_with_error(order_date),
+        "return_date": format_date_with_error(return_date),
+        "return_reason": random.choice(generate_return_reasons()),
+        "severity": random.choice(generate_severity_levels()),
+        "under_warranty": random.choice(["Y", "N", "true", "false", "1", "0"])
+    }
+
 def generate_warranty_claims(count: int, orders: List[Dict]) -> List[Dict]:
     """Generate warranty claims with dirty data"""
     claims = []
@@ -192,51 +266,9 @@ def generate_warranty_claims(count: int, orders: List[Dict]) -> List[Dict]:
         if orders:
             order = random.choice(orders)
             
-            # Parse the order date regardless of format
-            try:
-                if "/" in order["order_date"]:
-                    parts = order["order_date"].split("/")
-                    if len(parts[0]) == 4:  # YYYY/MM/DD
-                        order_date = datetime.datetime.strptime(order["order_date"], "%Y/%m/%d").date()
-                    else:  # DD/MM/YYYY
-                        order_date = datetime.datetime.strptime(order["order_date"], "%d/%m/%Y").date()
-                elif "-" in order["order_date"]:
-                    if "T" in order["order_date"]:  # ISO format
-                        order_date = datetime.datetime.fromisoformat(order["order_date"].replace("Z", "+00:00")).date()
-                    else:
-                        parts = order["order_date"].split("-")
-                        if len(parts[0]) == 4:  # YYYY-MM-DD
-                            order_date = datetime.datetime.strptime(order["order_date"], "%Y-%m-%d").date()
-                        else:  # DD-MM-YYYY
-                            order_date = datetime.datetime.strptime(order["order_date"], "%d-%m-%Y").date()
-                else:
-                    # Default to current date if parsing fails
-                    order_date = datetime.date.today()
-            except:
-                order_date = datetime.date.today()
-                
-            # Generate return date (sometimes before order date)
-            if random.random() < 0.05:
-                # Return date before order date (error)
-                days_before = random.randint(1, 30)
-                return_date = order_date - datetime.timedelta(days=days_before)
-            else:
-                # Normal return date after order date
-                days_after = random.randint(1, 365)
-                return_date = order_date + datetime.timedelta(days=days_after)
-                
-            claim = {
-                "claim_id": f"R{str(i + 200001).zfill(6)}",
-                "order_id": order["order_id"],
-                "product_id": maybe_case_change(order["product_id"], 0.5),
-                "order_date": format_date_with_error(order_date),
-                "return_date": format_date_with_error(return_date),
-                "return_reason": random.choice(generate_return_reasons()),
-                "severity": random.choice(generate_severity_levels()),
-                "under_warranty": random.choice(["Y", "N", "true", "false", "1", "0"])
-            }
-            
-            claims.append(claim)
+            order_date = parse_order_date(order["order_date"])
+            return_date = random_return_date(order_date)
+            claims.append(make_claim(i, order, order_date, return_date))
     
     # Add non-unique claim IDs (rare cases)
     if claims:
@@ -309,25 +341,219 @@ def generate_supplier_data(count: int, region_woods: List[str], wood_species: Li
 
 def write_ndjson(data: List[Dict], filepath: str):
     """Write data as NDJSON (newline delimited JSON)"""
-    with open(filepath, 'w') as f:
-        for item in data:
-            f.write(json.dumps(item) + '\n')
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(dump_lines(data))
 
 def write_json(data: List[Dict], filepath: str):
-    """Write data as standard JSON array"""
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+    """Write data as standard JSON array (one record per line)"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        dump_records(data, f)
 
 def write_csv(data: List[Dict], filepath: str):
     """Write data as CSV"""
     if not data:
         return
         
-    with open(filepath, 'w', newline='') as f:
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=data[0].keys())
         writer.writeheader()
         writer.writerows(data)
 
+# Replay mode
+def replay_events(product_ids: List[str], customer_ids: List[str],
+                  orders_per_day: float = REPLAY_ORDERS_PER_DAY,
+                  claim_rate: float = REPLAY_CLAIM_RATE) -> Iterator[Dict]:
+    """Endless time-ordered feed of orders and the claims that follow them.
+
+    Order dates follow a business clock starting at REPLAY_START_DATE that
+    advances one day every orders_per_day orders and wraps back to the start
+    every REPLAY_WINDOW_DAYS, so a feed running for days never leaves the date
+    range. A claim is held back until the clock reaches its return date, counted
+    on the unwrapped day number. Dirty-data rules are the batch ones.
+    """
+    pending_claims = []   # heap of (due business day, seq, order, order_date, return_date)
+    recent_orders = deque(maxlen=1000)
+    recent_claim_ids = deque(maxlen=1000)
+    order_index = 0
+    claim_index = 0
+
+    while True:
+        business_day = int(order_index / orders_per_day)
+        business_date = REPLAY_START_DATE + datetime.timedelta(days=business_day % REPLAY_WINDOW_DAYS)
+
+        # Claims whose return date has come
+        while pending_claims and pending_claims[0][0] <= business_day:
+            _, _, order, order_date, return_date = heapq.heappop(pending_claims)
+            claim = make_claim(claim_index, order, order_date, return_date)
+            claim_index += 1
+            # Non-unique claim IDs (rare cases)
+            if recent_claim_ids and random.random() < 0.01:
+                claim["claim_id"] = random.choice(recent_claim_ids)
+            recent_claim_ids.append(claim["claim_id"])
+            yield claim
+
+        # Duplicates re-send a recent order
+        if recent_orders and random.random() < DUPLICATE_RATE:
+            yield random.choice(recent_orders).copy()
+            continue
+
+        order = make_order(order_index, business_date, product_ids, customer_ids)
+        order_index += 1
+        recent_orders.append(order)
+        if random.random() < claim_rate:
+            return_date = random_return_date(business_date)
+            due_day = business_day + (return_date - business_date).days
+            heapq.heappush(pending_claims, (due_day, order_index, order, business_date, return_date))
+        yield order
+
+def profile_rate(profile: str, rate: float, elapsed: float, duration: float) -> float:
+    """Target events/sec at a given time into the run"""
+    if profile == "ramp":
+        return rate * max(0.01, min(1.0, elapsed / (duration or RAMP_SECONDS)))
+    if profile == "burst" and elapsed % BURST_PERIOD_SECONDS < BURST_SECONDS:
+        return rate * BURST_FACTOR
+    return rate
+
+class RollingWriter:
+    """Writes NDJSON to <directory>/events_<timestamp>_<n>.ndjson, starting a new file every rotate_bytes"""
+
+    def __init__(self, directory: str, rotate_bytes: int):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self.stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.files = 0
+        self.file = None
+        self.size = 0
+
+    def write(self, text: str):
+        if self.file is None or self.size >= self.rotate_bytes:
+            self.close()
+            self.files += 1
+            path = os.path.join(self.directory, f"events_{self.stamp}_{self.files:05d}.ndjson")
+            self.file = open(path, 'w', encoding='utf-8')
+            self.size = 0
+        self.file.write(text)
+        self.size += len(text)
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def open_replay_output(target: str, fifo: bool, rotate_mb: float):
+    """stdout for '-', rolling files for a directory (or a path ending in /), else a file or FIFO"""
+    if target == "-":
+        return sys.stdout
+    if target.endswith("/") or os.path.isdir(target):
+        return RollingWriter(target, int(rotate_mb * 1024 * 1024))
+    if fifo and not os.path.exists(target):
+        os.mkfifo(target)
+    # Opening a FIFO blocks until a reader (the loader) opens the other end
+    return open(target, 'w', encoding='utf-8')
+
+def run_replay(events: Iterator[Dict], out, rate: float, profile: str = "steady",
+               duration: float = 0.0, count: int = 0) -> Dict:
+    """Write events as NDJSON at the target rate with a token bucket; returns the achieved stats"""
+    log = sys.stderr
+    started = last = last_report = time.monotonic()
+    tokens = expected = 0.0
+    sent = sent_at_report = orders = claims = 0
+
+    try:
+        while True:
+            now = time.monotonic()
+            elapsed = now - started
+            if (duration and elapsed >= duration) or (count and sent >= count):
+                break
+
+            target = profile_rate(profile, rate, elapsed, duration)
+            tokens = min(tokens + target * (now - last), max(target * BUCKET_SECONDS, 1.0))
+            expected += target * (now - last)
+            last = now
+
+            # Write in chunks of at least 5ms worth of events to keep per-call overhead low
+            remaining = count - sent if count else MAX_CHUNK
+            batch_size = min(int(tokens), MAX_CHUNK, remaining)
+            if batch_size < max(1, min(target * 0.005, MAX_CHUNK, remaining)):
+                time.sleep(0.001)
+                continue
+
+            records = list(islice(events, batch_size))
+            out.write(dump_lines(records))
+            out.flush()
+            tokens -= batch_size
+            sent += batch_size
+            claims_in_batch = sum(1 for record in records if "claim_id" in record)
+            claims += claims_in_batch
+            orders += batch_size - claims_in_batch
+
+            if now - last_report >= 1.0:
+                achieved = (sent - sent_at_report) / (now - last_report)
+                print(f"t={elapsed:6.1f}s  target {target:>10,.0f}/s  achieved {achieved:>10,.0f}/s  "
+                      f"total {sent:,}", file=log)
+                batch_done(f"t={elapsed:.0f}s ({sent:,} events)")
+                last_report, sent_at_report = now, sent
+    except BrokenPipeError:
+        print("Reader closed the stream", file=log)
+    except KeyboardInterrupt:
+        pass
+
+    elapsed = time.monotonic() - started
+    return {"events": sent, "orders": orders, "claims": claims, "seconds": elapsed,
+            "rate": sent / elapsed if elapsed else 0.0, "expected": expected}
+
+def parse_replay_args(args: List[str]) -> Dict:
+    """--rate N --rate-profile steady|ramp|burst --duration S --count N --out -|file|fifo|dir/ --fifo --rotate-mb N"""
+    options = {"rate": 1000.0, "rate-profile": "steady", "duration": 0.0, "count": 0,
+               "out": "-", "fifo": False, "rotate-mb": 64.0}
+    i = 0
+    while i < len(args):
+        name = args[i].lstrip("-")
+        if name in ("replay", "fifo"):
+            options[name] = True
+            i += 1
+            continue
+        if name not in options or i + 1 >= len(args):
+            raise ValueError(f"Unknown option or missing value: {args[i]}")
+        default = options[name]
+        options[name] = type(default)(args[i + 1]) if not isinstance(default, str) else args[i + 1]
+        i += 2
+    if options["rate-profile"] not in REPLAY_PROFILES:
+        raise ValueError(f"--rate-profile must be one of {', '.join(REPLAY_PROFILES)}")
+    return options
+
+def replay_main(args: List[str]):
+    try:
+        options = parse_replay_args(args)
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        print("Usage: python FINAL_data_generator.py --replay [--rate 10000] [--rate-profile steady|ramp|burst]", file=sys.stderr)
+        print("       [--duration 60] [--count N] [--out -|feed.ndjson|feed.fifo|data_out/stream/] [--fifo] [--rotate-mb 64]",
+              file=sys.stderr)
+        print("       [--profile cpu|mem] [--profile-dir data_out/profiles]", file=sys.stderr)
+        sys.exit(1)
+
+    events = replay_events(generate_product_ids(50), generate_customer_ids(200))
+    out = open_replay_output(options["out"], options["fifo"], options["rotate-mb"])
+    print(f"Replaying at {options['rate']:,.0f} events/s ({options['rate-profile']}) to {options['out']}", file=sys.stderr)
+    try:
+        stats = run_replay(events, out, options["rate"], options["rate-profile"], options["duration"], options["count"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"✅ Replayed {stats['events']:,} events ({stats['orders']:,} orders, {stats['claims']:,} claims) "
+          f"in {stats['seconds']:.1f}s: {stats['rate']:,.0f} events/s achieved "
+          f"(target {options['rate']:,.0f}/s {options['rate-profile']})", file=sys.stderr)
+    if not options["count"] and stats["events"] < 0.95 * stats["expected"]:
+        print(f"⚠️  Generator-bound: {stats['events']:,} of the {stats['expected']:,.0f} events the rate profile asked for. "
+              f"Above this rate the bottleneck is this process, not the reader", file=sys.stderr)
+
 # Main execution
 def main():
     print("Generating dirty data for Arboré ETL project...")
@@ -341,18 +567,22 @@ def main():
     # Generate datasets
     print(f"Generating {NUM_ORDERS} orders...")
     orders = generate_orders(NUM_ORDERS, product_ids, customer_ids)
+    batch_done(f"generate {NUM_ORDERS} orders")
     
     print(f"Generating {NUM_CLAIMS} warranty claims...")
     claims = generate_warranty_claims(NUM_CLAIMS, orders)
+    batch_done(f"generate {NUM_CLAIMS} claims")
     
     print(f"Generating {NUM_SUPPLIERS} supplier wood specs...")
     suppliers = generate_supplier_data(NUM_SUPPLIERS, region_woods, wood_species)
+    batch_done(f"generate {NUM_SUPPLIERS} suppliers")
     
     # Write to files
     # Generate 2 JSON files and 1 CSV file
     write_json(orders, "data_out/orders/orders.json")
     write_json(claims, "data_out/claims/warranty_claims.json")
     write_csv(suppliers, "data_out/supplier/wood_specs.csv")
+    batch_done("write files")
     
     print("Data generation complete!")
     print(f"- Orders: {len(orders)} records (JSON)")
@@ -361,4 +591,20 @@ def main():
     print("Files written to data_out/ directory")
 
 if __name__ == "__main__":
-    main()
+    try:
+        args, profile_mode, profile_dir = pop_profile_options(sys.argv[1:], "data_out/profiles")
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        if any(shape in sys.argv for shape in REPLAY_PROFILES):
+            print("   The replay rate shape is set with --rate-profile steady|ramp|burst", file=sys.stderr)
+        sys.exit(1)
+    if profile_mode:
+        from arbore_profiling import start_profiling
+
+        start_profiling(profile_mode, "FINAL_data_generator_replay" if "--replay" in args else "FINAL_data_generator",
+                        profile_dir)
+
+    if "--replay" in args:
+        replay_main(args)
+    else:
+        main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Arboré batch auto-tuner
+Picks the batch size (and, for multi-file loads, the number of parse workers)
+while a load runs, instead of the operator guessing them per dataset.
+
+Every completed batch is timed end to end: decode, columnar buffering,
+Parquet encode and the upload/ingest of its files, i.e. the time since the
+previous batch finished. The tuner hill-climbs rows/s one knob at a time:
+it keeps doubling (or halving) the batch size while throughput improves by
+more than TOLERANCE, steps back to the best point when it drops, then does the
+same with the worker count, one worker at a time.
+
+Process RSS stays under a ceiling: nothing grows once RSS is above
+GROW_HEADROOM of it, and if RSS does cross it the batch size is halved, a
+worker is dropped and the batch size never grows past that point again.
+RSS covers the parse workers only when psutil is installed; otherwise it is
+this process from /proc/self/statm (Linux) or its peak from getrusage().
+
+The operating point of each run is saved to .arbore_autotune.json under a key
+such as snowflake/orders, and the next --autotune run with the same key
+starts from it.
+"""
+
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+AUTOTUNE_STATE_PATH = ".arbore_autotune.json"
+DEFAULT_MAX_RSS_MB = 2048
+
+MIN_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 1000000
+BATCH_STEP = 2.0          # batch size is multiplied or divided by this
+TOLERANCE = 0.05          # a move must gain 5% rows/s to count as better
+WARMUP_BATCHES = 1        # the first batch pays for imports and connection setup
+WINDOW_BATCHES = 2        # batches measured per setting
+GROW_HEADROOM = 0.8       # no knob grows while RSS is above this share of the ceiling
+
+
+def current_rss():
+    """Resident memory of this process (and its parse workers with psutil) in bytes, or None"""
+    if psutil is not None:
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows without psutil: no memory ceiling
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def load_operating_points(state_path=AUTOTUNE_STATE_PATH):
+    if state_path and os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+class AutoTuner:
+    """Hill-climbs batch size and worker count on measured rows/s under an RSS ceiling.
+
+    Call observe(rows) after each full batch (or each parsed file) and read
+    batch_size / workers before building the next one.
+    """
+
+    def __init__(self, key, batch_size, workers=1, max_workers=1, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 state_path=AUTOTUNE_STATE_PATH):
+        self.key = key
+        self.state_path = state_path
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.limits = {'batch_size': [MIN_BATCH_SIZE, MAX_BATCH_SIZE], 'workers': [1, max(1, max_workers)]}
+        self.settings = {'batch_size': batch_size, 'workers': min(workers, self.limits['workers'][1])}
+
+        saved = load_operating_points(state_path).get(key)
+        if saved:
+            self.settings['batch_size'] = saved['batch_size']
+            self.settings['workers'] = min(saved.get('workers', workers), self.limits['workers'][1])
+            print(f"🎛️  Auto-tune {key}: starting from the saved operating point, batch size "
+                  f"{self.batch_size}, {self.workers} workers ({saved['rows_per_s']:,.0f} rows/s on {saved['updated']})")
+
+        self.knobs = [knob for knob, (low, high) in self.limits.items() if low < high]
+        self.knob = 0
+        self.direction = {'batch_size': 1, 'workers': 1}
+        self.phase = None      # None, then 'forward' and maybe 'reverse' for the current knob
+        self.climbed = False   # a move of the current knob improved rows/s
+        self.best_rate = None
+        self.best_settings = dict(self.settings)
+
+        self.rss = current_rss()
+        self.peak_rss = self.rss or 0
+        self.at_floor = False  # over the ceiling with nothing left to back off
+        self.last = time.perf_counter()
+        self.batches = 0
+        self.window_rows = 0
+        self.window_seconds = 0.0
+        self.window_batches = 0
+        self.changes = 0
+        self.total_rows = 0
+        self.total_seconds = 0.0
+
+    @property
+    def batch_size(self):
+        return self.settings['batch_size']
+
+    @property
+    def workers(self):
+        return self.settings['workers']
+
+    @property
+    def settled(self):
+        return self.knob >= len(self.knobs)
+
+    def observe(self, rows):
+        """Record one finished batch of rows (timed since the previous call) and maybe move a knob"""
+        now = time.perf_counter()
+        seconds, self.last = now - self.last, now
+        self.batches += 1
+        if self.batches <= WARMUP_BATCHES:
+            return
+        self.total_rows += rows
+        self.total_seconds += seconds
+
+        rss = self.rss = current_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss, rss)
+            if rss > self.max_rss:
+                self._back_off(rss)
+                return
+
+        self.window_rows += rows
+        self.window_seconds += seconds
+        self.window_batches += 1
+        if self.window_batches < WINDOW_BATCHES:
+            return
+        rate = self.window_rows / max(self.window_seconds, 1e-9)
+        self.window_rows, self.window_seconds, self.window_batches = 0, 0.0, 0
+        self._step(rate)
+
+    def _step(self, rate):
+        improved = self.best_rate is None or rate > self.best_rate * (1 + TOLERANCE)
+        if improved:
+            self.climbed = self.climbed or self.phase is not None
+            self.best_rate, self.best_settings = rate, dict(self.settings)
+        else:
+            self.settings = dict(self.best_settings)
+        if self.settled:
+            return
+        if improved and self.phase is not None and self._move(self.knobs[self.knob]):
+            return  # still climbing: keep going the same way
+        self._next_move()
+
+    def _next_move(self):
+        """From the best point: the next untried direction of this knob, else the next knob"""
+        while not self.settled:
+            knob = self.knobs[self.knob]
+            if self.phase is None:
+                self.phase = 'forward'
+                if self._move(knob):
+                    return
+            # Coming back after a climb, the other side is already known to be slower
+            if self.phase == 'forward' and not self.climbed:
+                self.phase = 'reverse'
+                self.direction[knob] = -self.direction[knob]
+                if self._move(knob):
+                    return
+            self.knob += 1
+            self.phase, self.climbed = None, False
+        self._report(f"settled at batch size {self.batch_size}, {self.workers} workers "
+                     f"({self.best_rate:,.0f} rows/s)")
+
+    def _move(self, knob):
+        """Move knob one step in its direction; False when a limit (or the memory headroom) stops it"""
+        low, high = self.limits[knob]
+        value = self.settings[knob]
+        if self.direction[knob] > 0 and self.rss is not None and self.rss > self.max_rss * GROW_HEADROOM:
+            return False
+        if knob == 'batch_size':
+            step = BATCH_STEP if self.direction[knob] > 0 else 1 / BATCH_STEP
+            new_value = int(min(max(value * step, low), high))
+        else:
+            new_value = min(max(value + self.direction[knob], low), high)
+        if new_value == value:
+            return False
+
+        self.settings[knob] = new_value
+        self.changes += 1
+        self._report(f"{knob.replace('_', ' ')} {value} → {new_value} (best so far {self.best_rate:,.0f} rows/s)")
+        return True
+
+    def _back_off(self, rss):
+        ceiling = f"RSS {rss / 1024 / 1024:,.0f} MB is over the {self.max_rss / 1024 / 1024:,.0f} MB ceiling"
+        settings = dict(self.settings)
+        self.settings['batch_size'] = max(self.limits['batch_size'][0], self.batch_size // 2)
+        self.settings['workers'] = max(1, self.workers - 1)
+        self.limits['batch_size'][1] = self.batch_size
+        self.best_settings = dict(self.settings)
+        self.window_rows, self.window_seconds, self.window_batches = 0, 0.0, 0
+        if self.settings == settings:
+            if not self.at_floor:
+                self.at_floor = True
+                self._report(f"{ceiling} already at batch size {self.batch_size} and 1 worker, "
+                             f"most of it is not batch memory: raise --max-rss-mb")
+            return
+        self.changes += 1
+        self._report(f"{ceiling}, backing off to batch size {self.batch_size}, {self.workers} workers")
+
+    def _report(self, message):
+        print(f"🎛️  Auto-tune {self.key}: {message}")
+        logging.info(f"Auto-tune {self.key}: {message}")
+
+    def print_summary(self):
+        if not self.total_rows:
+            return
+        print(f"🎛️  Auto-tune {self.key}: batch size {self.best_settings['batch_size']}, "
+              f"{self.best_settings['workers']} workers, {self.total_rows / max(self.total_seconds, 1e-9):,.0f} rows/s "
+              f"over the run, peak RSS {self.peak_rss / 1024 / 1024:,.0f} MB ({self.changes} adjustments)")
+
+    def save(self):
+        """Keep the best operating point seen so the next run starts there"""
+        if self.best_rate is None or not self.state_path:
+            return
+        points = load_operating_points(self.state_path)
+        points[self.key] = {
+            'batch_size': self.best_settings['batch_size'],
+            'workers': self.best_settings['workers'],
+            'rows_per_s': round(self.best_rate),
+            'peak_rss_mb': round(self.peak_rss / 1024 / 1024),
+            'updated': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(points, f, indent=2)
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Arboré columnar batch buffers
+Hold pending orders/claims column-wise instead of as a list of record dicts
+"""
+
+import sys
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from arbore_codec import encode_variant, loads
+
+# (output column, record field, low cardinality)
+ORDER_COLUMNS = [
+    ("ORDER_ID", "order_id", False),
+    ("CUSTOMER_ID", "customer_id", True),
+    ("PRODUCT_ID", "product_id", True),
+    ("QUANTITY", "quantity", True),
+    ("ORDER_DATE", "order_date", True),
+    ("ORDER_NOTES", "order_notes", True),
+]
+
+CLAIM_COLUMNS = [
+    ("CLAIM_ID", "claim_id", False),
+    ("ORDER_ID", "order_id", False),
+    ("PRODUCT_ID", "product_id", True),
+    ("ORDER_DATE", "order_date", True),
+    ("RETURN_DATE", "return_date", True),
+    ("RETURN_REASON", "return_reason", True),
+    ("SEVERITY", "severity", True),
+    ("UNDER_WARRANTY", "under_warranty", True),
+]
+
+
+class DictionaryColumn:
+    """Low-cardinality column: one interned copy of each value plus a compact code array"""
+
+    __slots__ = ('values', 'lookup', 'codes')
+
+    def __init__(self):
+        self.values = []
+        self.lookup = {}
+        self.codes = array('H')
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > 0xFFFF and self.codes.typecode == 'H':
+                # Past 65k distinct values, widen the codes
+                self.codes = array('I', self.codes)
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+            self.lookup[value] = code
+        self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def to_numpy(self):
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values[np.frombuffer(self.codes, dtype=self.codes.typecode)]
+
+    def clear(self):
+        self.values = []
+        self.lookup = {}
+        self.codes = array(self.codes.typecode)
+
+
+class PlainColumn:
+    """High-cardinality column (order_id, claim_id) kept as a plain list of strings"""
+
+    __slots__ = ('values',)
+
+    def __init__(self):
+        self.values = []
+
+    def append(self, value):
+        self.values.append(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def to_numpy(self):
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values
+
+    def clear(self):
+        self.values = []
+
+
+class BatchRow:
+    """Read-only view of one buffered record, with the dict-style get() of a parsed record"""
+
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    def get(self, field, default=None):
+        column = self._batch.by_field.get(field)
+        if column is None:
+            return default
+        value = column[self._index]
+        if field in self._batch.variant_fields:
+            value = loads(value)
+        return value
+
+    def __getitem__(self, field):
+        if field not in self._batch.by_field:
+            raise KeyError(field)
+        return self.get(field)
+
+    def to_dict(self):
+        return {field: self.get(field) for field in self._batch.by_field}
+
+
+class ColumnarBatch:
+    """Column-wise buffer for one record type.
+
+    Low-cardinality fields are dictionary-encoded (interned values + uint16 codes),
+    the others are plain lists; fields in variant_fields are stored as their JSON
+    text, ready for a VARIANT column.
+    """
+
+    def __init__(self, columns, variant_fields=()):
+        self.columns = columns
+        self.variant_fields = frozenset(variant_fields)
+        self.data = [DictionaryColumn() if low_cardinality else PlainColumn()
+                     for _, _, low_cardinality in columns]
+        self.by_field = {field: column for (_, field, _), column in zip(columns, self.data)}
+        self.length = 0
+
+    def append(self, record):
+        for (_, field, _), column in zip(self.columns, self.data):
+            value = record.get(field)
+            if field in self.variant_fields:
+                value = encode_variant(value)
+            column.append(value)
+        self.length += 1
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length > 0
+
+    def row(self, i):
+        return BatchRow(self, i)
+
+    def rows(self):
+        return (BatchRow(self, i) for i in range(self.length))
+
+    def to_frame(self):
+        """Materialize the batch as a DataFrame with the Snowflake column names"""
+        return pd.DataFrame({name: column.to_numpy()
+                             for (name, _, _), column in zip(self.columns, self.data)})
+
+    def clear(self):
+        for column in self.data:
+            column.clear()
+        self.length = 0
+
+
+class FrameBatch:
+    """An already-columnar batch (a slice of a cached file) behind the to_frame() of ColumnarBatch"""
+
+    def __init__(self, pandas_df):
+        self.pandas_df = pandas_df
+
+    def __len__(self):
+        return len(self.pandas_df)
+
+    def __bool__(self):
+        return len(self.pandas_df) > 0
+
+    def to_frame(self):
+        return self.pandas_df
+
+
+def new_orders_batch():
+    return ColumnarBatch(ORDER_COLUMNS, variant_fields=("quantity",))
+
+
+def new_claims_batch():
+    return ColumnarBatch(CLAIM_COLUMNS)
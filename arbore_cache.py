@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Arboré parsed-input cache
+Re-running a load, a benchmark or a profile over the same orders.json pays
+the full JSON decode every time. With --cache, the first parse of a file
+stores its orders and claims as typed columns (the same columns the batches
+hand to Parquet) in uncompressed Arrow IPC files, readable as Feather v2.
+Later runs memory-map them instead of decoding the JSON again.
+
+- entries are found by path, size and mtime. If those changed, or the file is
+  a copy, the content hash (BLAKE2b) still finds the entry
+- the cache is capped at --cache-mb (default 2048 MB). Entries not used for
+  the longest are evicted first
+- every run prints its hits, misses and mapped MB, and
+  `python arbore_cache.py` lists the entries (`--clear` empties the cache)
+
+Records that are neither orders nor claims are not cached. Only their count
+is kept.
+
+Usage: python arbore_cache.py [--clear] [--dir .arbore_cache]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+
+CACHE_DIR = ".arbore_cache"
+DEFAULT_CACHE_MB = 2048
+CACHE_VERSION = 1  # bump when the cached columns change, old entries then stop matching
+
+KEYS_DIR = "keys"
+ENTRY_FILE = "entry.json"
+HASH_BLOCK_BYTES = 1 << 20
+
+# record type -> (batch factory name, variant fields decoded back for record dicts)
+RECORD_TYPES = {
+    'order': ('new_orders_batch', ('quantity',)),
+    'claim': ('new_claims_batch', ()),
+}
+
+
+def content_hash(data):
+    """BLAKE2b of the cache version and the file bytes"""
+    digest = hashlib.blake2b(str(CACHE_VERSION).encode(), digest_size=16)
+    for start in range(0, len(data), HASH_BLOCK_BYTES):
+        digest.update(data[start:start + HASH_BLOCK_BYTES])
+    return digest.hexdigest()
+
+
+def stat_key(path):
+    """Key of a file's current path, size and mtime"""
+    st = os.stat(path)
+    identity = f"{CACHE_VERSION}|{os.path.realpath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest(), st
+
+
+def build_tables(records):
+    """Typed columns of the orders and claims among records; returns ({record_type: pa.Table}, unknown)"""
+    import pyarrow as pa
+
+    import arbore_batches
+    from py_snowpipe_arbore import detect_record_type
+
+    batches = {record_type: getattr(arbore_batches, factory)() for record_type, (factory, _) in RECORD_TYPES.items()}
+    unknown = 0
+    for record in records:
+        batch = batches.get(detect_record_type(record)) if isinstance(record, dict) else None
+        if batch is None:
+            unknown += 1
+            continue
+        batch.append(record)
+    tables = {record_type: pa.Table.from_pandas(batch.to_frame(), preserve_index=False)
+              for record_type, batch in batches.items() if batch}
+    return tables, unknown
+
+
+def iter_frames(table, batch_size):
+    """pandas DataFrames of batch_size rows; batch_size may be a callable returning the current size"""
+    offset = 0
+    while offset < table.num_rows:
+        size = batch_size() if callable(batch_size) else batch_size
+        yield table.slice(offset, size).to_pandas()
+        offset += size
+
+
+def iter_records(record_type, table, chunk_size=50000):
+    """Record dicts (lower-case field names, VARIANT fields decoded) rebuilt from a cached table"""
+    import arbore_batches
+    from arbore_codec import loads
+
+    factory, variant_fields = RECORD_TYPES[record_type]
+    columns = getattr(arbore_batches, factory)().columns
+    for offset in range(0, table.num_rows, chunk_size):
+        data = table.slice(offset, chunk_size).to_pydict()
+        values = []
+        for name, field, _ in columns:
+            column = data[name]
+            if field in variant_fields:
+                decoded = {text: loads(text) for text in set(column) if text is not None}
+                column = [decoded.get(text) for text in column]
+            values.append(column)
+        fields = [field for _, field, _ in columns]
+        for row in zip(*values):
+            yield dict(zip(fields, row))
+
+
+class ParseCache:
+    """Arrow IPC files of parsed input files with LRU eviction, shared by every process using the same directory"""
+
+    def __init__(self, directory=CACHE_DIR, max_mb=DEFAULT_CACHE_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.mapped_bytes = 0
+        self.stored_bytes = 0
+        self.evicted = 0
+        os.makedirs(os.path.join(directory, KEYS_DIR), exist_ok=True)
+
+    def load(self, path):
+        """({record_type: pa.Table}, unknown) of a JSON/NDJSON file: memory-mapped on a hit, parsed and stored on a miss.
+
+        Returns None when a column mixes types Arrow cannot hold in one column;
+        the caller then parses the file the usual way.
+        """
+        key, st = stat_key(path)
+        key_path = os.path.join(self.directory, KEYS_DIR, key + ".json")
+        try:
+            with open(key_path, 'r', encoding='utf-8') as f:
+                digest = json.load(f)['content_hash']
+            cached = self._map(digest)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # Unknown path/size/mtime: the content may still be cached (a copy, a touched file)
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = content_hash(data)
+        cached = self._map(digest)
+        if cached is not None:
+            self.hits += 1
+        else:
+            import pyarrow as pa
+
+            from arbore_parallel import parse_records
+
+            self.misses += 1
+            try:
+                cached = build_tables(parse_records(data, path))
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                logging.warning(f"Parse cache: {path} cannot be stored as Arrow columns ({e}), not cached")
+                return None
+            del data
+            self._store(digest, *cached)
+        self._write_json(key_path, {'path': os.path.realpath(path), 'size': st.st_size,
+                                    'mtime_ns': st.st_mtime_ns, 'content_hash': digest})
+        return cached
+
+    def _map(self, digest):
+        """Memory-map an entry's tables (zero-copy, the files are uncompressed) and mark it used"""
+        import pyarrow as pa
+
+        entry_dir = os.path.join(self.directory, digest)
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            tables = {}
+            for record_type in entry['records']:
+                file_path = os.path.join(entry_dir, record_type + ".arrow")
+                tables[record_type] = pa.ipc.open_file(pa.memory_map(file_path, 'r')).read_all()
+                self.mapped_bytes += os.path.getsize(file_path)
+            os.utime(os.path.join(entry_dir, ENTRY_FILE))
+        except (OSError, ValueError, KeyError, pa.ArrowInvalid):
+            return None  # missing, half-evicted or unreadable: parse again
+        return tables, entry['unknown']
+
+    def _store(self, digest, tables, unknown):
+        import pyarrow as pa
+
+        entry_dir = os.path.join(self.directory, digest)
+        tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            for record_type, table in tables.items():
+                with pa.OSFile(os.path.join(tmp_dir, record_type + ".arrow"), 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+            self._write_json(os.path.join(tmp_dir, ENTRY_FILE),
+                             {'records': {record_type: table.num_rows for record_type, table in tables.items()},
+                              'unknown': unknown, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')})
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            # another process stored the same content first, or the disk is full: either way keep going
+            logging.info(f"Parse cache entry {digest} not stored: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.stored_bytes += entry_size(entry_dir)
+        self.evict(keep=digest)
+
+    def entries(self):
+        """(digest, bytes, last used, entry) of every complete entry, least recently used first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            entry_path = os.path.join(self.directory, name, ENTRY_FILE)
+            if name == KEYS_DIR or '.tmp' in name or not os.path.exists(entry_path):
+                continue
+            try:
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                entries.append((name, entry_size(os.path.join(self.directory, name)),
+                                os.path.getmtime(entry_path), entry))
+            except (OSError, ValueError):
+                continue
+        return sorted(entries, key=lambda item: item[2])
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _, _ in entries)
+        evicted = set()
+        for digest, size, _, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, digest), ignore_errors=True)
+            evicted.add(digest)
+            total -= size
+            self.evicted += 1
+        if evicted:
+            self._drop_keys(evicted)
+
+    def clear(self):
+        entries = self.entries()
+        for digest, _, _, _ in entries:
+            shutil.rmtree(os.path.join(self.directory, digest), ignore_errors=True)
+        self._drop_keys({digest for digest, _, _, _ in entries})
+        return len(entries)
+
+    def _drop_keys(self, digests):
+        keys_dir = os.path.join(self.directory, KEYS_DIR)
+        for name in os.listdir(keys_dir):
+            try:
+                with open(os.path.join(keys_dir, name), 'r', encoding='utf-8') as f:
+                    if json.load(f).get('content_hash') in digests:
+                        os.unlink(os.path.join(keys_dir, name))
+            except (OSError, ValueError):
+                continue
+
+    @staticmethod
+    def _write_json(path, value):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def add_stats(self, stats):
+        """Fold in the counters of a cache used in another process (parse workers)"""
+        for name in ('hits', 'misses', 'mapped_bytes', 'stored_bytes', 'evicted'):
+            setattr(self, name, getattr(self, name) + stats[name])
+
+    def stats(self):
+        return {name: getattr(self, name) for name in ('hits', 'misses', 'mapped_bytes', 'stored_bytes', 'evicted')}
+
+    def print_summary(self):
+        used = sum(size for _, size, _, _ in self.entries())
+        print(f"💾 Parse cache: {self.hits} hits, {self.misses} misses, {self.mapped_bytes / 1024 / 1024:,.1f} MB "
+              f"mapped, {self.stored_bytes / 1024 / 1024:,.1f} MB stored, {self.evicted} evicted "
+              f"({used / 1024 / 1024:,.1f} of {self.max_bytes / 1024 / 1024:,.0f} MB used in {self.directory}/)")
+
+
+def entry_size(entry_dir):
+    return sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("Usage: python arbore_cache.py [--clear] [--dir .arbore_cache]")
+        sys.exit(0)
+    directory = args[args.index('--dir') + 1] if '--dir' in args[:-1] else CACHE_DIR
+    if not os.path.isdir(directory):
+        print(f"💾 No parse cache in {directory}/")
+        return
+
+    cache = ParseCache(directory)
+    if '--clear' in args:
+        print(f"🧹 Removed {cache.clear()} entries from {directory}/")
+        return
+
+    paths = {}
+    keys_dir = os.path.join(directory, KEYS_DIR)
+    for name in os.listdir(keys_dir):
+        try:
+            with open(os.path.join(keys_dir, name), 'r', encoding='utf-8') as f:
+                key = json.load(f)
+            paths.setdefault(key['content_hash'], []).append(key['path'])
+        except (OSError, ValueError, KeyError):
+            continue
+
+    entries = cache.entries()
+    print(f"💾 {len(entries)} entries, {sum(size for _, size, _, _ in entries) / 1024 / 1024:,.1f} MB "
+          f"in {directory}/ (least recently used first)")
+    for digest, size, used, entry in entries:
+        records = ", ".join(f"{count:,} {record_type}s" for record_type, count in entry['records'].items())
+        print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(used))}  {size / 1024 / 1024:8.1f} MB  "
+              f"{records or 'no records'}  {', '.join(sorted(paths.get(digest, ['?'])))}")
+
+
+if __name__ == "__main__":
+    main()
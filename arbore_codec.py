@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Arboré JSON codec
+One place for JSON encode/decode on the hot paths (generator output, loader
+input, the quantity VARIANT). Uses orjson when it is installed
+(`pip install orjson`) and the standard library otherwise; both backends
+write the same compact JSON.
+"""
+
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+# quantity is 1..5 or one of a few words: encode each distinct value once
+VARIANT_CACHE_SIZE = 1024
+_variant_cache = {}
+
+READ_BLOCK_CHARS = 1 << 20  # iter_json_array reads this much text at a time
+_SKIP_SEPARATORS = re.compile(r'[\s,]*')
+
+
+if orjson is not None:
+    def loads(data):
+        """Decode JSON from str or bytes"""
+        return orjson.loads(data)
+
+    def dumps(value):
+        """Compact JSON text"""
+        return orjson.dumps(value).decode('utf-8')
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    loads = json.loads
+
+    def dumps(value):
+        """Compact JSON text"""
+        return _encoder.encode(value)
+
+
+def iter_path(path):
+    """Yield the records of a JSON array, NDJSON/JSONL or single-object .json file one at a time.
+
+    Arrays written one record per line (dump_records) are decoded line by line;
+    from the first line that is not a whole record on its own, the rest of the
+    array is decoded incrementally with iter_json_array. Either way only the
+    current record and a read block are held, never the whole file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        if head.startswith('['):
+            yield from _iter_array_lines(f)
+        elif head.startswith('{') and path.lower().endswith('.json'):
+            yield loads(f.read())
+        else:
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+
+
+def _iter_array_lines(f):
+    rest = f.readline().lstrip()[1:]  # after the opening '['
+    if rest.strip():
+        yield from iter_json_array(f, rest)
+        return
+    for line in f:
+        text = line.strip()
+        if not text:
+            continue
+        if text == ']':
+            return
+        try:
+            record = loads(text[:-1] if text.endswith(',') else text)
+        except JSONDecodeError:
+            record = None
+        if not isinstance(record, dict):
+            yield from iter_json_array(f, line)
+            return
+        yield record
+
+
+def iter_json_array(f, buffer=None):
+    """Yield the elements of a JSON array one at a time, reading text file f in blocks.
+
+    buffer is text already read from f just after the opening '[', if any.
+    """
+    decoder = json.JSONDecoder()
+    if buffer is None:
+        buffer = f.read(READ_BLOCK_CHARS).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError("not a JSON array")
+        buffer = buffer[1:]
+    pos, eof = 0, False
+    while True:
+        pos = _SKIP_SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if complete:
+            yield value
+            pos = end
+            continue
+        block = f.read(READ_BLOCK_CHARS)
+        eof = not block
+        buffer, pos = buffer[pos:] + block, 0
+        if eof and not buffer.strip():
+            raise ValueError("unterminated JSON array")
+
+
+def dump_records(records, f):
+    """Write records as a JSON array with one record per line (still a regular .json file)"""
+    f.write('[\n' + ',\n'.join(map(dumps, records)) + '\n]\n')
+
+
+def dump_lines(records):
+    """NDJSON text for records, one per line"""
+    return ''.join(dumps(record) + '\n' for record in records)
+
+
+def encode_variant(value):
+    """JSON text of a value for a VARIANT column (quantity can be 3 or "three")"""
+    key = (type(value), value)
+    try:
+        return _variant_cache[key]
+    except KeyError:
+        text = dumps(value)
+        if len(_variant_cache) < VARIANT_CACHE_SIZE:
+            _variant_cache[key] = text
+        return text
+    except TypeError:
+        return dumps(value)  # lists and dicts are not hashable
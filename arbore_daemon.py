@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Arboré watch daemon
+Watches data_out/orders and data_out/claims, tails NDJSON files and stdin, and
+flushes micro-batches to a loader when the oldest buffered record reaches the
+latency SLA or the buffered bytes reach a size limit, whichever comes first.
+
+The loader is any object with add(record) and flush(): SnowpipeLoader from
+py_snowpipe_arbore.py, or the per-record INSERT sink of py_insert_arbore.py.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+from arbore_codec import JSONDecodeError, dumps, loads
+
+DEFAULT_WATCH_DIRS = ["data_out/orders", "data_out/claims"]
+WATCH_STATE_PATH = ".arbore_watch_state.json"
+
+DEFAULT_MAX_LATENCY_SECONDS = 5.0
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+POLL_INTERVAL_SECONDS = 0.5
+READ_CHUNK_BYTES = 1024 * 1024  # NDJSON catch-up is read this much at a time
+
+WATCHED_SUFFIXES = ('.json', '.ndjson', '.jsonl')
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+
+class FileTail:
+    """Reads the records appended to one file since the last call.
+
+    NDJSON/JSONL files are tailed line by line from a byte offset, READ_CHUNK_BYTES
+    at a time (a trailing partial line waits for its newline). A .json array
+    file is parsed once it parses as a whole, and again when its size or mtime
+    changes. If the records already emitted are unchanged (same hash of their
+    JSON), only the ones after them are yielded, so an array that grows is
+    loaded incrementally; an array rewritten with other records (as the
+    generator does with data_out/orders/orders.json) is loaded again in full.
+    Each array parse reads the whole file, so large or fast-growing feeds
+    belong in NDJSON.
+
+    The offset (and emitted count) moves past a record as it is yielded, so the
+    state saved by a flush never covers records the loader has not received.
+    """
+
+    def __init__(self, path, offset=0, signature=None, emitted=0, emitted_hash=None):
+        self.path = path
+        self.offset = offset
+        self.signature = signature
+        self.emitted = emitted
+        self.emitted_hash = emitted_hash
+
+    def read_records(self):
+        """Yield (record, size_in_bytes) for every new complete record"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+
+        if self.path.lower().endswith('.json'):
+            yield from self._read_array(stat)
+        else:
+            yield from self._read_lines(stat)
+
+    def _read_array(self, stat):
+        signature = [stat.st_size, stat.st_mtime]
+        if signature == self.signature:
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            try:
+                data = loads(f.read())
+            except JSONDecodeError:
+                return  # still being written
+        if not isinstance(data, list):
+            data = [data]
+        hasher = hashlib.blake2b(digest_size=16)
+        if self.emitted:
+            for record in data[:self.emitted]:
+                hasher.update(dumps(record).encode('utf-8'))
+            if len(data) < self.emitted or hasher.hexdigest() != self.emitted_hash:
+                logging.warning(f"{self.path} was rewritten, reading it from the start")
+                self.emitted = 0
+                hasher = hashlib.blake2b(digest_size=16)
+        self.offset = stat.st_size
+        record_size = stat.st_size // max(len(data), 1)
+        for record in data[self.emitted:]:
+            hasher.update(dumps(record).encode('utf-8'))
+            self.emitted += 1
+            self.emitted_hash = hasher.hexdigest()
+            yield record, record_size
+        self.signature = signature
+
+    def _read_lines(self, stat):
+        if stat.st_size < self.offset:
+            logging.warning(f"{self.path} was truncated, reading it from the start")
+            self.offset = 0
+        if stat.st_size == self.offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            remaining = stat.st_size - self.offset
+            partial = b''
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                lines = (partial + chunk).split(b'\n')
+                partial = lines.pop()  # no newline yet: carried into the next chunk
+                for line in lines:
+                    self.offset += len(line) + 1
+                    record = parse_line(line, self.path)
+                    if record is not None:
+                        yield record, len(line) + 1
+
+    def state(self):
+        return {'offset': self.offset, 'signature': self.signature, 'emitted': self.emitted,
+                'emitted_hash': self.emitted_hash}
+
+
+class DirectoryWatcher:
+    """Reports files that changed in the watched directories.
+
+    Uses inotify when the inotify_simple package is installed and falls back to
+    polling file sizes and mtimes otherwise.
+    """
+
+    def __init__(self, directories, poll_interval=POLL_INTERVAL_SECONDS):
+        self.directories = directories
+        self.poll_interval = poll_interval
+        self.seen = {}
+        self.inotify = None
+        self.watch_dirs = {}
+
+        if INotify is not None and directories:
+            self.inotify = INotify()
+            mask = inotify_flags.CLOSE_WRITE | inotify_flags.MODIFY | inotify_flags.MOVED_TO | inotify_flags.CREATE
+            for directory in directories:
+                self.watch_dirs[self.inotify.add_watch(directory, mask)] = directory
+            logging.info("Watching with inotify")
+        else:
+            logging.info("Watching by polling")
+
+    def initial_files(self):
+        """All matching files already present in the watched directories"""
+        paths = []
+        for directory in self.directories:
+            for name in sorted(os.listdir(directory)):
+                if name.lower().endswith(WATCHED_SUFFIXES):
+                    paths.append(os.path.join(directory, name))
+        return paths
+
+    def changed_files(self, timeout):
+        """Block up to timeout seconds and return the paths that changed"""
+        if self.inotify is not None:
+            events = self.inotify.read(timeout=int(timeout * 1000))
+            return {os.path.join(self.watch_dirs[event.wd], event.name)
+                    for event in events if event.name.lower().endswith(WATCHED_SUFFIXES)}
+
+        time.sleep(timeout)
+        changed = set()
+        for path in self.initial_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if self.seen.get(path) != signature:
+                self.seen[path] = signature
+                changed.add(path)
+        return changed
+
+
+def parse_line(line, source):
+    """Decode one NDJSON line, skipping blank and malformed lines"""
+    if not line.strip():
+        return None
+    try:
+        return loads(line)
+    except JSONDecodeError as e:
+        logging.warning(f"Skipping malformed line from {source}: {e}")
+        return None
+
+
+def start_stdin_reader(stream=None):
+    """Read NDJSON lines from stdin on a background thread; None marks end of input"""
+    stream = stream or sys.stdin
+    lines = queue.Queue()
+
+    def pump():
+        for line in stream:
+            if line.strip():
+                lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=pump, name="stdin-reader", daemon=True).start()
+    return lines
+
+
+def load_state(state_path):
+    if state_path and os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state_path, tails):
+    if not state_path:
+        return
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({path: tail.state() for path, tail in tails.items()}, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _stop_on_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_daemon(loader, sources, max_latency=DEFAULT_MAX_LATENCY_SECONDS, max_bytes=DEFAULT_MAX_BYTES,
+               poll_interval=POLL_INTERVAL_SECONDS, state_path=WATCH_STATE_PATH):
+    """Feed records from directories, files and stdin ('-') to loader until interrupted.
+
+    A flush happens when the oldest buffered record is max_latency seconds old or
+    max_bytes are buffered, also in the middle of a file being caught up on. File offsets are saved to state_path after every
+    flush, so a restart resumes where the last flushed data ended. The daemon
+    exits by itself only when stdin is its sole source and reaches end of input.
+    """
+    directories = [s for s in sources if s != '-' and os.path.isdir(s)]
+    files = [s for s in sources if s != '-' and not os.path.isdir(s)]
+    stdin_lines = start_stdin_reader() if '-' in sources else None
+
+    state = load_state(state_path)
+    tails = {}
+
+    def tail_for(path):
+        if path not in tails:
+            saved = state.get(path, {})
+            tails[path] = FileTail(path, saved.get('offset', 0), saved.get('signature'), saved.get('emitted', 0),
+                                   saved.get('emitted_hash'))
+        return tails[path]
+
+    watcher = DirectoryWatcher(directories, poll_interval)
+    dirty = set(watcher.initial_files()) | set(files)
+
+    pending_bytes = 0
+    oldest = None
+    flushes = 0
+    records_total = 0
+
+    def flush():
+        nonlocal pending_bytes, oldest, flushes
+        if oldest is None:
+            return
+        started = time.monotonic()
+        loader.flush()
+        save_state(state_path, tails)
+        logging.info(f"Flushed {pending_bytes} bytes, {time.monotonic() - oldest:.2f}s after the oldest record "
+                     f"(flush took {time.monotonic() - started:.2f}s)")
+        pending_bytes = 0
+        oldest = None
+        flushes += 1
+
+    def accept(record, size):
+        nonlocal pending_bytes, oldest, records_total
+        if oldest is None:
+            oldest = time.monotonic()
+        loader.add(record)
+        pending_bytes += size
+        records_total += 1
+
+    previous_handler = signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    print(f"👀 Watching {', '.join(sources)} (flush every {max_latency}s or {max_bytes:,} bytes). Ctrl+C to stop.")
+    try:
+        stdin_open = stdin_lines is not None
+        while True:
+            for path in sorted(dirty):
+                for record, size in tail_for(path).read_records():
+                    accept(record, size)
+                    if pending_bytes >= max_bytes:
+                        flush()
+            dirty.clear()
+
+            while stdin_open:
+                try:
+                    line = stdin_lines.get_nowait()
+                except queue.Empty:
+                    break
+                if line is None:
+                    stdin_open = False
+                    break
+                record = parse_line(line, "stdin")
+                if record is not None:
+                    accept(record, len(line))
+
+            if oldest is not None and (time.monotonic() - oldest >= max_latency or pending_bytes >= max_bytes):
+                flush()
+
+            if stdin_lines is not None and not stdin_open and not directories and not files:
+                break
+
+            timeout = poll_interval
+            if oldest is not None:
+                timeout = max(0.0, min(timeout, max_latency - (time.monotonic() - oldest)))
+            dirty |= watcher.changed_files(timeout)
+            dirty |= set(files)
+    except KeyboardInterrupt:
+        print("Stopping watch daemon...")
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        flush()
+
+    print(f"✅ Watch daemon stopped: {records_total} records in {flushes} flushes")
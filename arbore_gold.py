@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Arboré client-side gold aggregates
+Keeps the GOLD_ORDERS_DAILY, GOLD_RETURNS_DAILY and GOLD_RETURN_RATE_DAILY
+numbers up to date as batches pass through the loader, instead of refreshing
+them over the whole silver history.
+
+- rows are parsed and validated with the silver rules (rejects are not counted)
+- unique customers per day are HyperLogLog sketches, so states can be merged
+- the state lives in <state_dir>/gold_state.sqlite; each flush commits the
+  days it changed, not the whole history
+- each flush writes the changed days to small delta CSVs in <state_dir>/deltas/,
+  to be upserted by day into the dashboard tables
+
+Like the silver dedup + MERGE, duplicate IDs within a batch keep the latest
+row, and an ID seen in an earlier batch replaces that batch's contribution.
+For this the state keeps each ID's day and counts in keyed index tables that
+are looked up per batch and never rewritten as a whole. A customer already
+added to the sketch of the replaced row's day stays in it.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+from arbore_normalize import (SILVER_DATE_FORMATS, decode_under_warranty, normalize_dates,
+                              normalize_severity, parse_quantity)
+
+DEFAULT_GOLD_DIR = "gold_state"
+STATE_FILE = "gold_state.sqlite"
+DELTA_DIR = "deltas"
+LOOKUP_CHUNK = 500  # IDs per index lookup (under SQLite's bound-parameter limit)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS order_days (day TEXT PRIMARY KEY, orders_count INTEGER,
+                                       total_quantity INTEGER, customers BLOB);
+CREATE TABLE IF NOT EXISTS return_days (day TEXT PRIMARY KEY, returns_count INTEGER,
+                                        under_warranty_cnt INTEGER, critical_cnt INTEGER);
+CREATE TABLE IF NOT EXISTS order_index (order_id TEXT PRIMARY KEY, day TEXT, quantity INTEGER) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS claim_index (claim_id TEXT PRIMARY KEY, day TEXT, under_warranty INTEGER,
+                                        critical INTEGER) WITHOUT ROWID;
+"""
+
+HLL_PRECISION = 10  # 1024 registers per day, ~3% standard error
+
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for a uint64 array"""
+    values = values.copy()
+    lengths = np.zeros(values.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = (values >> np.uint64(shift)) != 0
+        lengths[high] += shift
+        values[high] >>= np.uint64(shift)
+    lengths += (values != 0).astype(np.uint8)
+    return lengths
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 64-bit hashes"""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            registers = np.zeros(self.m, dtype=np.uint8)
+        self.registers = registers
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        rank = (width + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Small-range correction (linear counting)
+            raw = self.m * np.log(self.m / zeros)
+        return int(round(raw))
+
+    @classmethod
+    def from_bytes(cls, data, precision=HLL_PRECISION):
+        registers = np.frombuffer(data, dtype=np.uint8).copy()
+        return cls(precision, registers)
+
+
+def hash_values(values):
+    """Stable 64-bit hashes of string values (same key across runs)"""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+class DailyGold:
+    """Per-day gold aggregates maintained batch by batch.
+
+    The daily rows are held in memory (one per day); the per-ID index stays in
+    SQLite. Index changes are written as batches arrive and committed by save()
+    in the same transaction as the changed days, so a crash between flushes
+    rolls both back to the last flush.
+    """
+
+    def __init__(self, state_dir=DEFAULT_GOLD_DIR):
+        self.state_dir = state_dir
+        self.orders = {}   # day -> {'orders_count', 'total_quantity', 'customers' (HyperLogLog)}
+        self.returns = {}  # day -> {'returns_count', 'under_warranty_cnt', 'critical_cnt'}
+        self.touched_orders = set()
+        self.touched_returns = set()
+        self.unsaved_orders = set()   # days changed since the last save()
+        self.unsaved_returns = set()
+        self.rejected = {'orders': 0, 'claims': 0}
+        self.delta_files = 0
+        os.makedirs(state_dir, exist_ok=True)
+        self.db = sqlite3.connect(self.state_path)
+        self.db.executescript(SCHEMA)
+        self.load()
+
+    @property
+    def state_path(self):
+        return os.path.join(self.state_dir, STATE_FILE)
+
+    def load(self):
+        precision = self.db.execute("SELECT value FROM meta WHERE key = 'hll_precision'").fetchone()
+        precision = int(precision[0]) if precision else HLL_PRECISION
+        for day, orders_count, total_quantity, customers in self.db.execute("SELECT * FROM order_days"):
+            self.orders[day] = {'orders_count': orders_count, 'total_quantity': total_quantity,
+                                'customers': HyperLogLog.from_bytes(customers, precision)}
+        for day, returns_count, under_warranty_cnt, critical_cnt in self.db.execute("SELECT * FROM return_days"):
+            self.returns[day] = {'returns_count': returns_count, 'under_warranty_cnt': under_warranty_cnt,
+                                 'critical_cnt': critical_cnt}
+        logging.info(f"Loaded gold state for {len(self.orders)} order days and {len(self.returns)} return days")
+
+    def save(self):
+        """Commit the index changes and the days changed since the last save"""
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('hll_precision', ?)", (str(HLL_PRECISION),))
+        for day in self.unsaved_orders:
+            row = self.orders.get(day)
+            if row is None:
+                self.db.execute("DELETE FROM order_days WHERE day = ?", (day,))
+            else:
+                self.db.execute("INSERT OR REPLACE INTO order_days VALUES (?, ?, ?, ?)",
+                                (day, row['orders_count'], row['total_quantity'], row['customers'].registers.tobytes()))
+        for day in self.unsaved_returns:
+            row = self.returns.get(day)
+            if row is None:
+                self.db.execute("DELETE FROM return_days WHERE day = ?", (day,))
+            else:
+                self.db.execute("INSERT OR REPLACE INTO return_days VALUES (?, ?, ?, ?)",
+                                (day, row['returns_count'], row['under_warranty_cnt'], row['critical_cnt']))
+        self.db.commit()
+        self.unsaved_orders = set()
+        self.unsaved_returns = set()
+
+    def _lookup(self, table, key_column, ids):
+        """{id: (day, counts...)} for the ids already in an index table"""
+        found = {}
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            chunk = ids[start:start + LOOKUP_CHUNK]
+            rows = self.db.execute(f"SELECT * FROM {table} WHERE {key_column} IN ({', '.join('?' * len(chunk))})",
+                                   chunk)
+            found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def _touch_orders(self, days):
+        self.touched_orders.update(days)
+        self.unsaved_orders.update(days)
+
+    def _touch_returns(self, days):
+        self.touched_returns.update(days)
+        self.unsaved_returns.update(days)
+
+    def add_orders(self, df):
+        """Fold a batch DataFrame (ARBORE_ORDERS columns) into the daily order aggregates"""
+        order_id = df["ORDER_ID"].astype("string").str.strip()
+        quantity = parse_quantity(df["QUANTITY"])
+        order_date = normalize_dates(df["ORDER_DATE"], SILVER_DATE_FORMATS)
+
+        valid = (order_id.notna() & quantity.notna() & (quantity >= 0) & order_date.notna()).to_numpy()
+        self.rejected['orders'] += int((~valid).sum())
+        orders = pd.DataFrame({
+            'order_id': order_id[valid],
+            'customer_id': df["CUSTOMER_ID"].astype("string").str.strip()[valid],
+            'quantity': quantity[valid].round().astype("int64"),
+            'order_date': order_date[valid],
+        })
+        orders = orders.sort_values('order_date').drop_duplicates('order_id', keep='last')
+        if orders.empty:
+            return
+
+        orders['day'] = orders['order_date'].dt.strftime("%Y-%m-%d")
+        ids = orders['order_id'].tolist()
+        for day, quantity in self._lookup('order_index', 'order_id', ids).values():
+            self.orders[day]['orders_count'] -= 1
+            self.orders[day]['total_quantity'] -= quantity
+            self._touch_orders([day])
+        self.db.executemany("INSERT OR REPLACE INTO order_index VALUES (?, ?, ?)",
+                            zip(ids, orders['day'].tolist(), orders['quantity'].tolist()))
+
+        totals = orders.groupby('day').agg(orders_count=('order_id', 'size'), total_quantity=('quantity', 'sum'))
+        customers = orders[orders['customer_id'].notna()]
+        hashes = hash_values(customers['customer_id'].to_numpy(dtype=object))
+
+        for day, positions in customers.groupby('day').indices.items():
+            self._order_day(day)['customers'].add_hashes(hashes[positions])
+        for day, row in totals.iterrows():
+            current = self._order_day(day)
+            current['orders_count'] += int(row['orders_count'])
+            current['total_quantity'] += int(row['total_quantity'])
+        self._touch_orders(totals.index)
+        self._drop_empty_days(self.orders, 'orders_count')
+
+    def add_claims(self, df):
+        """Fold a batch DataFrame (ARBORE_WARRANTY_CLAIMS columns) into the daily return aggregates"""
+        ids = {column: df[column].astype("string").str.strip() for column in ("CLAIM_ID", "ORDER_ID", "PRODUCT_ID")}
+        order_date = normalize_dates(df["ORDER_DATE"], SILVER_DATE_FORMATS)
+        return_date = normalize_dates(df["RETURN_DATE"], SILVER_DATE_FORMATS)
+        under_warranty = decode_under_warranty(df["UNDER_WARRANTY"])
+
+        valid = (ids["CLAIM_ID"].notna() & ids["ORDER_ID"].notna() & ids["PRODUCT_ID"].notna()
+                 & order_date.notna() & return_date.notna() & (return_date >= order_date)
+                 & under_warranty.notna()).to_numpy()
+        self.rejected['claims'] += int((~valid).sum())
+        claims = pd.DataFrame({
+            'claim_id': ids["CLAIM_ID"][valid],
+            'return_date': return_date[valid],
+            'under_warranty': under_warranty[valid].astype(bool),
+            'critical': (normalize_severity(df["SEVERITY"])[valid] == "CRITICAL").fillna(False),
+        })
+        claims = claims.sort_values('return_date').drop_duplicates('claim_id', keep='last')
+        if claims.empty:
+            return
+
+        claims['day'] = claims['return_date'].dt.strftime("%Y-%m-%d")
+        ids = claims['claim_id'].tolist()
+        for day, under_warranty, critical in self._lookup('claim_index', 'claim_id', ids).values():
+            current = self.returns[day]
+            current['returns_count'] -= 1
+            current['under_warranty_cnt'] -= under_warranty
+            current['critical_cnt'] -= critical
+            self._touch_returns([day])
+        self.db.executemany("INSERT OR REPLACE INTO claim_index VALUES (?, ?, ?, ?)",
+                            zip(ids, claims['day'].tolist(), claims['under_warranty'].astype(int).tolist(),
+                                claims['critical'].astype(int).tolist()))
+
+        totals = claims.groupby('day').agg(returns_count=('claim_id', 'size'),
+                                           under_warranty_cnt=('under_warranty', 'sum'),
+                                           critical_cnt=('critical', 'sum'))
+        for day, row in totals.iterrows():
+            current = self.returns.setdefault(day, {'returns_count': 0, 'under_warranty_cnt': 0, 'critical_cnt': 0})
+            for column in current:
+                current[column] += int(row[column])
+        self._touch_returns(totals.index)
+        self._drop_empty_days(self.returns, 'returns_count')
+
+    def _order_day(self, day):
+        if day not in self.orders:
+            self.orders[day] = {'orders_count': 0, 'total_quantity': 0, 'customers': HyperLogLog()}
+        return self.orders[day]
+
+    @staticmethod
+    def _drop_empty_days(days, count_column):
+        # A day left without rows disappears from the gold table, as with GROUP BY
+        for day in [day for day, row in days.items() if row[count_column] <= 0]:
+            del days[day]
+
+    def merge(self, other):
+        """Add the aggregates of another DailyGold built from different input into this one"""
+        for day, row in other.orders.items():
+            current = self._order_day(day)
+            current['orders_count'] += row['orders_count']
+            current['total_quantity'] += row['total_quantity']
+            current['customers'].merge(row['customers'])
+        for day, row in other.returns.items():
+            current = self.returns.setdefault(day, {'returns_count': 0, 'under_warranty_cnt': 0, 'critical_cnt': 0})
+            for column in current:
+                current[column] += row[column]
+        self.db.executemany("INSERT OR REPLACE INTO order_index VALUES (?, ?, ?)",
+                            other.db.execute("SELECT * FROM order_index"))
+        self.db.executemany("INSERT OR REPLACE INTO claim_index VALUES (?, ?, ?, ?)",
+                            other.db.execute("SELECT * FROM claim_index"))
+        self._touch_orders(other.orders)
+        self._touch_returns(other.returns)
+
+    # Rows for the given days; a day no longer in the state gets zeros, so
+    # upserting a delta by day also clears days whose rows were all replaced
+
+    def orders_rows(self, days):
+        rows = []
+        for day in sorted(days):
+            row = self.orders.get(day)
+            rows.append({'day': day, 'orders_count': row['orders_count'] if row else 0,
+                         'total_quantity': row['total_quantity'] if row else 0,
+                         'unique_customers': row['customers'].estimate() if row else 0})
+        return rows
+
+    def returns_rows(self, days):
+        empty = {'returns_count': 0, 'under_warranty_cnt': 0, 'critical_cnt': 0}
+        return [dict(day=day, **self.returns.get(day, empty)) for day in sorted(days)]
+
+    def return_rate_rows(self, days):
+        rows = []
+        for day in sorted(days):
+            orders_count = self.orders.get(day, {}).get('orders_count', 0)
+            returns_count = self.returns.get(day, {}).get('returns_count', 0)
+            rows.append({'day': day, 'orders_count': orders_count, 'returns_count': returns_count,
+                         'return_rate_pct': returns_count * 100.0 / orders_count if orders_count else None})
+        return rows
+
+    def emit_delta(self):
+        """Write the days changed since the last call to delta CSVs and save the state"""
+        touched = self.touched_orders | self.touched_returns
+        if not touched:
+            return []
+        delta_dir = os.path.join(self.state_dir, DELTA_DIR)
+        os.makedirs(delta_dir, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S_%f")
+
+        written = []
+        for table, rows in (('gold_orders_daily', self.orders_rows(self.touched_orders)),
+                            ('gold_returns_daily', self.returns_rows(self.touched_returns)),
+                            ('gold_return_rate_daily', self.return_rate_rows(touched))):
+            if not rows:
+                continue
+            path = os.path.join(delta_dir, f"{table}_{stamp}.csv")
+            pd.DataFrame(rows).to_csv(path, index=False)
+            written.append(path)
+
+        logging.info(f"Gold delta: {len(touched)} days in {len(written)} files")
+        self.delta_files += len(written)
+        self.touched_orders = set()
+        self.touched_returns = set()
+        self.save()
+        return written
+
+    def print_summary(self):
+        print(f"🥇 Gold state: {len(self.orders)} order days, {len(self.returns)} return days "
+              f"({self.delta_files} delta files in {os.path.join(self.state_dir, DELTA_DIR)})")
+        if self.rejected['orders'] or self.rejected['claims']:
+            print(f"   Not aggregated (silver rejects): {self.rejected['orders']} orders, "
+                  f"{self.rejected['claims']} claims")
+
+
+if __name__ == "__main__":
+    state_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_GOLD_DIR
+    if not os.path.exists(os.path.join(state_dir, STATE_FILE)):
+        print(f"❌ Error: no gold state in {state_dir}")
+        sys.exit(1)
+
+    gold = DailyGold(state_dir)
+    days = sorted(set(gold.orders) | set(gold.returns))
+    print(pd.DataFrame(gold.return_rate_rows(days)).tail(10).to_string(index=False))
+    print(f"📊 {sum(row['orders_count'] for row in gold.orders.values())} orders, "
+          f"{sum(row['returns_count'] for row in gold.returns.values())} returns over {len(days)} days")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Arboré local DuckDB sink
+Loads the staged Parquet batches into a local DuckDB file and runs the same
+bronze -> silver -> gold logic as the warehouse, so the transform layer can be
+profiled and benchmarked offline:
+
+- bronze tables stand in for ARBORE_ORDERS / ARBORE_WARRANTY_CLAIMS
+- a per-table load sequence stands in for the ARBORE_*_STRM streams
+- the silver step mirrors sp_load_silver_orders_from_parsed_v1 and
+  SP_LOAD_F_ORDER_RETURN_SILVER_FROM_PARSED_V1 (parse, validate, reject, dedup, merge)
+- the gold tables mirror the GOLD_*_DAILY_PARSED_DT dynamic tables and are
+  refreshed only for the days touched by each batch
+
+Requires the duckdb package (pip install duckdb).
+"""
+
+import logging
+import os
+import time
+
+SCHEMA_SQL = """
+CREATE SEQUENCE IF NOT EXISTS bronze_load_seq;
+
+CREATE TABLE IF NOT EXISTS bronze_orders (
+  ORDER_ID VARCHAR, CUSTOMER_ID VARCHAR, PRODUCT_ID VARCHAR, QUANTITY VARCHAR,
+  ORDER_DATE VARCHAR, ORDER_NOTES VARCHAR,
+  PRICE_EUR DOUBLE, CATEGORY VARCHAR, WOOD_SPECIES VARCHAR,
+  _load_seq BIGINT DEFAULT nextval('bronze_load_seq')
+);
+
+CREATE TABLE IF NOT EXISTS bronze_warranty_claims (
+  CLAIM_ID VARCHAR, ORDER_ID VARCHAR, PRODUCT_ID VARCHAR, ORDER_DATE VARCHAR,
+  RETURN_DATE VARCHAR, RETURN_REASON VARCHAR, SEVERITY VARCHAR, UNDER_WARRANTY VARCHAR,
+  _load_seq BIGINT DEFAULT nextval('bronze_load_seq')
+);
+
+CREATE TABLE IF NOT EXISTS bronze_wood_specs (
+  REGION_WOOD VARCHAR, WOOD_SPECIES VARCHAR, DENSITY_KG_M3 DOUBLE, HARDNESS_N DOUBLE,
+  CARBON_STORAGE_KG_CO2E_PER_KG DOUBLE, RECYCLABILITY_RATE_PCT DOUBLE, CERTIFICATION VARCHAR,
+  ORIGIN VARCHAR, UPDATED_AT DATE,
+  FLAG_DENSITY_UNKNOWN BOOLEAN, FLAG_HARDNESS_MISSING BOOLEAN, FLAG_CARBON_NEGATIVE BOOLEAN,
+  FLAG_RECYCLABILITY_CAPPED BOOLEAN, FLAG_CERTIFICATION_UNKNOWN BOOLEAN, FLAG_UPDATED_AT_INVALID BOOLEAN,
+  _load_seq BIGINT DEFAULT nextval('bronze_load_seq')
+);
+
+CREATE TABLE IF NOT EXISTS stream_offsets (
+  table_name VARCHAR PRIMARY KEY,
+  last_seq   BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS silver_orders (
+  order_id VARCHAR PRIMARY KEY, customer_id VARCHAR, product_id VARCHAR,
+  quantity DECIMAL(38,0), order_date TIMESTAMP, order_notes VARCHAR, ingestion_date DATE
+);
+
+CREATE TABLE IF NOT EXISTS silver_orders_rejects (
+  raw_record JSON, reason VARCHAR, logged_at TIMESTAMP DEFAULT current_timestamp
+);
+
+CREATE TABLE IF NOT EXISTS f_order_return_silver (
+  claim_id VARCHAR PRIMARY KEY, order_id VARCHAR, product_id VARCHAR,
+  order_date TIMESTAMP, return_date TIMESTAMP, return_reason VARCHAR,
+  severity VARCHAR, under_warranty BOOLEAN, ingestion_date DATE
+);
+
+CREATE TABLE IF NOT EXISTS f_order_return_rejects (
+  raw_record JSON, reason VARCHAR, logged_at TIMESTAMP DEFAULT current_timestamp
+);
+
+CREATE TABLE IF NOT EXISTS gold_orders_daily (
+  day DATE PRIMARY KEY, orders_count BIGINT, total_quantity DECIMAL(38,0), unique_customers BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS gold_returns_daily (
+  day DATE PRIMARY KEY, returns_count BIGINT, under_warranty_cnt BIGINT, critical_cnt BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS gold_return_rate_daily (
+  day DATE PRIMARY KEY, orders_count BIGINT, returns_count BIGINT, return_rate_pct DOUBLE
+);
+
+-- Snowflake TRY_TO_TIMESTAMP_TZ(value) with AUTO format detection
+CREATE OR REPLACE MACRO auto_ts(value) AS COALESCE(
+  try_strptime(value, '%Y-%m-%dT%H:%M:%SZ'),
+  try_strptime(value, '%Y-%m-%d'),
+  try_strptime(value, '%m/%d/%Y')
+);
+"""
+
+# Snowflake table -> local bronze table
+BRONZE_TABLES = {
+    'ARBORE_ORDERS': 'bronze_orders',
+    'ARBORE_WARRANTY_CLAIMS': 'bronze_warranty_claims',
+    'ARBORE_WOOD_SPECS': 'bronze_wood_specs',
+}
+
+# Stream consume: rows loaded since the last silver run
+STREAM_SQL = """
+CREATE OR REPLACE TEMP TABLE tmp_stream AS
+SELECT * FROM {bronze}
+WHERE _load_seq > COALESCE((SELECT last_seq FROM stream_offsets WHERE table_name = '{bronze}'), 0);
+
+INSERT OR REPLACE INTO stream_offsets
+SELECT '{bronze}', COALESCE(MAX(_load_seq), (SELECT last_seq FROM stream_offsets WHERE table_name = '{bronze}'), 0)
+FROM {bronze};
+"""
+
+SILVER_ORDERS_STEPS = [
+    ('parse', """
+CREATE OR REPLACE TEMP TABLE tmp_parsed AS
+SELECT
+  TRIM(ORDER_ID)                                   AS order_id,
+  TRIM(CUSTOMER_ID)                                AS customer_id,
+  TRIM(PRODUCT_ID)                                 AS product_id,
+  TRY_CAST(TRIM(QUANTITY, '"') AS DECIMAL(38,0))   AS quantity_num,
+  COALESCE(
+    try_strptime(ORDER_DATE, '%Y-%m-%dT%H:%M:%SZ'),
+    try_strptime(ORDER_DATE, '%Y-%m-%dT%H:%M:%S.%fZ'),
+    try_strptime(ORDER_DATE, '%Y-%m-%d'),
+    auto_ts(ORDER_DATE)
+  )                                                AS order_date_ts,
+  NULLIF(TRIM(ORDER_NOTES), '')                    AS order_notes,
+  json_object('order_id', ORDER_ID, 'customer_id', CUSTOMER_ID, 'product_id', PRODUCT_ID,
+              'quantity', QUANTITY, 'order_date', ORDER_DATE, 'order_notes', ORDER_NOTES) AS raw_full
+FROM tmp_stream;
+"""),
+    ('validate', """
+CREATE OR REPLACE TEMP TABLE tmp_validated AS
+SELECT *,
+  CASE
+    WHEN order_id IS NULL      THEN 'order_id is NULL'
+    WHEN quantity_num IS NULL  THEN 'quantity not numeric'
+    WHEN quantity_num < 0      THEN 'quantity negative'
+    WHEN order_date_ts IS NULL THEN 'order_date invalid'
+  END AS reject_reason
+FROM tmp_parsed;
+"""),
+    ('reject', """
+INSERT INTO silver_orders_rejects (raw_record, reason)
+SELECT raw_full, reject_reason FROM tmp_validated WHERE reject_reason IS NOT NULL;
+"""),
+    ('dedup', """
+CREATE OR REPLACE TEMP TABLE tmp_dedup AS
+SELECT order_id, customer_id, product_id, quantity_num AS quantity,
+       order_date_ts AS order_date, order_notes, current_date AS ingestion_date
+FROM tmp_validated
+WHERE reject_reason IS NULL
+QUALIFY ROW_NUMBER() OVER (PARTITION BY order_id ORDER BY order_date_ts DESC NULLS LAST) = 1;
+
+CREATE OR REPLACE TEMP TABLE tmp_days AS
+SELECT DISTINCT CAST(order_date AS DATE) AS day FROM tmp_dedup
+UNION
+SELECT DISTINCT CAST(s.order_date AS DATE) FROM silver_orders s JOIN tmp_dedup d USING (order_id);
+"""),
+    ('merge', """
+INSERT INTO silver_orders
+SELECT * FROM tmp_dedup
+ON CONFLICT (order_id) DO UPDATE SET
+  customer_id = excluded.customer_id,
+  product_id = excluded.product_id,
+  quantity = excluded.quantity,
+  order_date = excluded.order_date,
+  order_notes = excluded.order_notes,
+  ingestion_date = excluded.ingestion_date;
+"""),
+    ('gold', """
+DELETE FROM gold_orders_daily WHERE day IN (SELECT day FROM tmp_days);
+
+INSERT INTO gold_orders_daily
+SELECT CAST(order_date AS DATE), COUNT(*), SUM(quantity), COUNT(DISTINCT customer_id)
+FROM silver_orders
+WHERE CAST(order_date AS DATE) IN (SELECT day FROM tmp_days)
+GROUP BY 1;
+"""),
+]
+
+SILVER_CLAIMS_STEPS = [
+    ('parse', """
+CREATE OR REPLACE TEMP TABLE tmp_parsed AS
+SELECT
+  TRIM(CLAIM_ID)   AS claim_id,
+  TRIM(ORDER_ID)   AS order_id,
+  TRIM(PRODUCT_ID) AS product_id,
+  COALESCE(try_strptime(ORDER_DATE, '%m/%d/%Y'), try_strptime(ORDER_DATE, '%Y-%m-%d'),
+           auto_ts(ORDER_DATE))  AS order_date_ts,
+  COALESCE(try_strptime(RETURN_DATE, '%Y-%m-%d'), try_strptime(RETURN_DATE, '%m/%d/%Y'),
+           auto_ts(RETURN_DATE)) AS return_date_ts,
+  NULLIF(TRIM(RETURN_REASON), '') AS return_reason,
+  UPPER(TRIM(SEVERITY))           AS severity_up,
+  UPPER(TRIM(UNDER_WARRANTY))     AS uw_str,
+  json_object('claim_id', CLAIM_ID, 'order_id', ORDER_ID, 'product_id', PRODUCT_ID,
+              'order_date', ORDER_DATE, 'return_date', RETURN_DATE, 'return_reason', RETURN_REASON,
+              'severity', SEVERITY, 'under_warranty', UNDER_WARRANTY) AS raw_full
+FROM tmp_stream;
+"""),
+    ('validate', """
+CREATE OR REPLACE TEMP TABLE tmp_validated AS
+SELECT *,
+  CASE
+    WHEN claim_id IS NULL                 THEN 'claim_id is NULL'
+    WHEN order_id IS NULL                 THEN 'order_id is NULL'
+    WHEN product_id IS NULL               THEN 'product_id is NULL'
+    WHEN order_date_ts IS NULL            THEN 'order_date invalid'
+    WHEN return_date_ts IS NULL           THEN 'return_date invalid'
+    WHEN return_date_ts < order_date_ts   THEN 'return_date before order_date'
+    WHEN under_warranty_bool IS NULL      THEN 'under_warranty undecodable'
+  END AS reject_reason
+FROM (
+  SELECT *,
+    CASE
+      WHEN severity_up IN ('MINOR', 'MAJOR', 'CRITICAL') THEN severity_up
+      WHEN severity_up IS NULL OR severity_up = '' THEN NULL
+      ELSE 'OTHER'
+    END AS severity,
+    CASE
+      WHEN uw_str IN ('1', 'Y', 'YES', 'TRUE')  THEN TRUE
+      WHEN uw_str IN ('0', 'N', 'NO', 'FALSE')  THEN FALSE
+    END AS under_warranty_bool
+  FROM tmp_parsed
+);
+"""),
+    ('reject', """
+INSERT INTO f_order_return_rejects (raw_record, reason)
+SELECT raw_full, reject_reason FROM tmp_validated WHERE reject_reason IS NOT NULL;
+"""),
+    ('dedup', """
+CREATE OR REPLACE TEMP TABLE tmp_dedup AS
+SELECT claim_id, order_id, product_id, order_date_ts AS order_date, return_date_ts AS return_date,
+       return_reason, severity, under_warranty_bool AS under_warranty, current_date AS ingestion_date
+FROM tmp_validated
+WHERE reject_reason IS NULL
+QUALIFY ROW_NUMBER() OVER (PARTITION BY claim_id ORDER BY return_date_ts DESC NULLS LAST) = 1;
+
+CREATE OR REPLACE TEMP TABLE tmp_days AS
+SELECT DISTINCT CAST(return_date AS DATE) AS day FROM tmp_dedup
+UNION
+SELECT DISTINCT CAST(s.return_date AS DATE) FROM f_order_return_silver s JOIN tmp_dedup d USING (claim_id);
+"""),
+    ('merge', """
+INSERT INTO f_order_return_silver
+SELECT * FROM tmp_dedup
+ON CONFLICT (claim_id) DO UPDATE SET
+  order_id = excluded.order_id,
+  product_id = excluded.product_id,
+  order_date = excluded.order_date,
+  return_date = excluded.return_date,
+  return_reason = excluded.return_reason,
+  severity = excluded.severity,
+  under_warranty = excluded.under_warranty,
+  ingestion_date = excluded.ingestion_date;
+"""),
+    ('gold', """
+DELETE FROM gold_returns_daily WHERE day IN (SELECT day FROM tmp_days);
+
+INSERT INTO gold_returns_daily
+SELECT CAST(return_date AS DATE), COUNT(*),
+       SUM(CASE WHEN under_warranty THEN 1 ELSE 0 END),
+       SUM(CASE WHEN severity = 'CRITICAL' THEN 1 ELSE 0 END)
+FROM f_order_return_silver
+WHERE CAST(return_date AS DATE) IN (SELECT day FROM tmp_days)
+GROUP BY 1;
+"""),
+]
+
+# GOLD_RETURN_RATE_DAILY_PARSED_DT, refreshed for the days touched by either side
+RETURN_RATE_SQL = """
+DELETE FROM gold_return_rate_daily WHERE day IN (SELECT day FROM tmp_days);
+
+INSERT INTO gold_return_rate_daily
+SELECT d.day,
+       COALESCE(o.orders_count, 0),
+       COALESCE(r.returns_count, 0),
+       CASE WHEN COALESCE(o.orders_count, 0) = 0 THEN NULL
+            ELSE COALESCE(r.returns_count, 0) * 100.0 / o.orders_count END
+FROM tmp_days d
+LEFT JOIN gold_orders_daily o ON o.day = d.day
+LEFT JOIN gold_returns_daily r ON r.day = d.day
+WHERE d.day IS NOT NULL AND (o.day IS NOT NULL OR r.day IS NOT NULL);
+"""
+
+TABLE_STEPS = {
+    'ARBORE_ORDERS': SILVER_ORDERS_STEPS,
+    'ARBORE_WARRANTY_CLAIMS': SILVER_CLAIMS_STEPS,
+}
+
+
+class DuckDBSink:
+    """Local stand-in for the Snowflake stage + Snowpipe + silver/gold layers.
+
+    send() appends the Parquet files to the bronze table and immediately runs the
+    silver and gold steps for the new rows, timing each step.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, path):
+        import duckdb
+
+        self.path = path
+        self.con = duckdb.connect(path)
+        self.con.execute(SCHEMA_SQL)
+        self.timings = {}
+        logging.info(f"Local DuckDB sink ready at {path}")
+
+    def _run(self, step, sql):
+        started = time.perf_counter()
+        self.con.execute(sql)
+        self.timings[step] = self.timings.get(step, 0.0) + time.perf_counter() - started
+
+    def send(self, staged_files, table, partition_stats=None):
+        """Load Parquet files into bronze and run silver + gold for them; returns the row count"""
+        bronze = BRONZE_TABLES[table]
+        rows = 0
+
+        loaded = []
+
+        self.con.execute("BEGIN TRANSACTION")
+        try:
+            for stage_dir, file_name, out_path, row_count in staged_files:
+                file_size = os.path.getsize(out_path)
+                self._run('bronze', f"INSERT INTO {bronze} BY NAME SELECT * FROM read_parquet('{out_path}')")
+                loaded.append((stage_dir, out_path, file_size, row_count))
+                rows += row_count
+
+            # Wood specs have no silver procedure yet (D_WOOD_SPECS_SILVER is commented out)
+            if table in TABLE_STEPS:
+                self._run('stream', STREAM_SQL.format(bronze=bronze))
+                for step, sql in TABLE_STEPS[table]:
+                    self._run(step, sql)
+                self._run('gold', RETURN_RATE_SQL)
+            self.con.execute("COMMIT")
+        except Exception:
+            # The files stay on disk so the caller can dead-letter them
+            self.con.execute("ROLLBACK")
+            raise
+
+        for stage_dir, out_path, file_size, row_count in loaded:
+            os.unlink(out_path)
+            if partition_stats is not None:
+                stats = partition_stats.setdefault(stage_dir, {'files': 0, 'bytes': 0, 'rows': 0})
+                stats['files'] += 1
+                stats['bytes'] += file_size
+                stats['rows'] += row_count
+
+        return rows
+
+    def flush(self):
+        pass  # every send() already ran silver and gold
+
+    def print_summary(self):
+        counts = {
+            name: self.con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            for name in ('bronze_wood_specs', 'silver_orders', 'silver_orders_rejects', 'f_order_return_silver',
+                         'f_order_return_rejects', 'gold_orders_daily', 'gold_returns_daily',
+                         'gold_return_rate_daily')
+        }
+        print(f"🦆 Local DuckDB sink: {self.path}")
+        for name, count in counts.items():
+            print(f"  {name}: {count} rows")
+        if self.timings:
+            print("  Step timings: " + ", ".join(f"{step} {seconds:.3f}s" for step, seconds in self.timings.items()))
+
+    def close(self):
+        self.con.close()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Arboré normalization helpers
+Vectorized parsing of the dirty values produced by FINAL_data_generator.py
+"""
+
+import numpy as np
+import pandas as pd
+
+# Date formats emitted by format_date_with_error(), tried in order.
+# MM/DD/YYYY is tried before DD/MM/YYYY, like the silver claims procedure.
+DATE_FORMATS = [
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+]
+
+# Formats the silver procedures accept (explicit formats plus Snowflake AUTO
+# detection); DD/MM/YYYY and DD-MM-YYYY dates are rejected there
+SILVER_DATE_FORMATS = [
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+]
+
+SEVERITIES = ('MINOR', 'MAJOR', 'CRITICAL')
+RETURN_REASONS = ('battery', 'movement', 'strap', 'glass', 'finish', 'defect')
+WARRANTY_TRUE = ('1', 'Y', 'YES', 'TRUE')
+WARRANTY_FALSE = ('0', 'N', 'NO', 'FALSE')
+
+# Stage path layout for each partition granularity
+PARTITION_FORMATS = {
+    'year': "%Y",
+    'month': "%Y/%m",
+    'day': "%Y/%m/%d",
+}
+
+UNKNOWN_PARTITION = "unknown"
+
+
+def normalize_dates(values, formats=DATE_FORMATS):
+    """Parse a column of mixed-format date strings (NaT when unparseable)"""
+    raw = pd.Series(values, dtype="object").astype("string").str.strip()
+
+    # A batch repeats a few hundred distinct dates: parse each one once
+    codes, uniques = pd.factorize(raw)
+    distinct = pd.Series(uniques, dtype="string")
+    parsed = pd.Series(pd.NaT, index=distinct.index, dtype="datetime64[ns]")
+
+    for fmt in formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(distinct[missing], format=fmt, errors="coerce")
+
+    dates = np.append(parsed.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    return pd.Series(dates[codes], index=raw.index)
+
+
+def partition_keys(dates, granularity):
+    """Map normalized dates to stage sub-paths like 2025/05 ('unknown' when NaT)"""
+    if granularity not in PARTITION_FORMATS:
+        raise ValueError(f"Unknown partition granularity: {granularity}")
+    return dates.dt.strftime(PARTITION_FORMATS[granularity]).fillna(UNKNOWN_PARTITION)
+
+
+def normalize_product_ids(values):
+    """Trim and upper-case product IDs so W009, w009 and ' W009 ' share one key"""
+    return pd.Series(values, dtype="object").astype("string").str.strip().str.upper()
+
+
+def parse_quantity(values):
+    """Numeric quantity from the VARIANT JSON text ('3' -> 3, '"two"' -> NaN), like TRY_TO_NUMBER"""
+    text = pd.Series(values, dtype="object").astype("string").str.strip().str.strip('"')
+    return pd.to_numeric(text, errors="coerce")
+
+
+def normalize_severity(values):
+    """MINOR/MAJOR/CRITICAL after trim + upper, OTHER for anything else, NA when blank"""
+    upper = pd.Series(values, dtype="object").astype("string").str.strip().str.upper()
+    severity = upper.where(upper.isin(SEVERITIES) | upper.isna(), "OTHER")
+    return severity.mask(upper == "")
+
+
+def decode_under_warranty(values):
+    """True/False from Y/N, 1/0, true/false, yes/no; NA when undecodable"""
+    upper = pd.Series(values, dtype="object").astype("string").str.strip().str.upper()
+    decoded = pd.Series(pd.NA, index=upper.index, dtype="boolean")
+    decoded[upper.isin(WARRANTY_TRUE).fillna(False)] = True
+    decoded[upper.isin(WARRANTY_FALSE).fillna(False)] = False
+    return decoded
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Arboré parallel file loading
+Loads many order/claim files (a directory of daily files, a glob) at once. A
+process pool decodes the JSON, builds the columnar batches and writes the
+partitioned Parquet files; the parent process only uploads them.
+
+Per batch a worker returns the Parquet files it wrote plus, when the parent
+keeps gold aggregates, the batch itself as an Arrow IPC stream: one bytes
+buffer crosses the process boundary instead of pickled rows. Results are
+handed back in input order, so duplicate IDs resolve the same way as in a
+one-file-at-a-time load.
+"""
+
+import glob
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from arbore_codec import loads
+
+INPUT_EXTENSIONS = ('.json', '.ndjson', '.jsonl')
+GLOB_CHARS = ('*', '?', '[')
+
+# record type -> (table, partition date column, stage prefix)
+BATCH_TARGETS = {
+    'order': ('ARBORE_ORDERS', 'ORDER_DATE', 'orders'),
+    'claim': ('ARBORE_WARRANTY_CLAIMS', 'RETURN_DATE', 'claims'),
+}
+
+# Set once per worker process by _init_worker()
+_worker = {}
+
+
+def resolve_input_paths(patterns):
+    """Expand directories (recursively) and glob patterns into a sorted list of input files"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(INPUT_EXTENSIONS))
+        elif any(char in pattern for char in GLOB_CHARS):
+            paths.extend(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        else:
+            paths.append(pattern)
+    return sorted(set(paths))
+
+
+def read_records(path):
+    """All records of a JSON array file or an NDJSON/JSONL file"""
+    with open(path, 'rb') as f:
+        return parse_records(f.read(), path)
+
+
+def parse_records(data, path):
+    """Decode the bytes of a JSON array file or an NDJSON/JSONL file (path only tells .json from NDJSON)"""
+    head = data[:64].lstrip()
+    if head.startswith(b'['):
+        return loads(data)
+    if head.startswith(b'{') and path.lower().endswith('.json'):
+        return [loads(data)]
+    return [loads(line) for line in data.splitlines() if line.strip()]
+
+
+def frame_to_ipc(pandas_df):
+    """Serialize a batch as an Arrow IPC stream"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(pandas_df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_from_ipc(data):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def _init_worker(batch_size, granularity, temp_dir_name, enrich_path, keep_frames, cache=None):
+    from py_snowpipe_arbore import ProductIndex
+
+    parse_cache = None
+    if cache is not None:
+        from arbore_cache import ParseCache
+        parse_cache = ParseCache(*cache)
+
+    _worker.update(
+        batch_size=batch_size,
+        granularity=granularity,
+        temp_dir=SimpleNamespace(name=temp_dir_name),
+        product_index=ProductIndex(enrich_path) if enrich_path else None,
+        keep_frames=keep_frames,
+        cache=parse_cache,
+    )
+
+
+def parse_file(path, batch_size=None):
+    """Worker: turn one input file into Parquet files.
+
+    Returns a dict with the file's batches as (table, staged_files, ipc_or_None)
+    tuples, the number of unknown records and the enrichment match counts
+    (plus this file's parse cache counters when the pool has a cache).
+    batch_size overrides the pool's batch size (the auto-tuner changes it per file).
+    """
+    from arbore_batches import new_claims_batch, new_orders_batch
+    from py_snowpipe_arbore import detect_record_type
+
+    batch_size = batch_size or _worker['batch_size']
+    product_index = _worker['product_index']
+    matched_before = (product_index.matched, product_index.unmatched) if product_index else (0, 0)
+
+    result = {'path': path, 'batches': [], 'records': 0, 'unknown': 0}
+    cache = _worker['cache']
+    cached = None
+    if cache is not None:
+        stats_before = cache.stats()
+        cached = cache.load(path)
+        result['cache'] = {name: value - stats_before[name] for name, value in cache.stats().items()}
+
+    if cached is not None:
+        from arbore_batches import FrameBatch
+        from arbore_cache import iter_frames
+
+        tables, result['unknown'] = cached
+        for record_type, table in tables.items():
+            for pandas_df in iter_frames(table, batch_size):
+                result['batches'].append(_write_batch(record_type, FrameBatch(pandas_df)))
+                result['records'] += len(pandas_df)
+        records = ()
+    else:
+        records = read_records(path)
+
+    batches = {'order': new_orders_batch(), 'claim': new_claims_batch()}
+    for record in records:
+        record_type = detect_record_type(record)
+        batch = batches.get(record_type)
+        if batch is None:
+            result['unknown'] += 1
+            continue
+        batch.append(record)
+        result['records'] += 1
+        if len(batch) >= batch_size:
+            result['batches'].append(_write_batch(record_type, batch))
+            batch.clear()
+
+    for record_type, batch in batches.items():
+        if batch:
+            result['batches'].append(_write_batch(record_type, batch))
+
+    if product_index:
+        result['matched'] = product_index.matched - matched_before[0]
+        result['unmatched'] = product_index.unmatched - matched_before[1]
+    return result
+
+
+def _write_batch(record_type, batch):
+    from py_snowpipe_arbore import write_partitioned_parquet
+
+    table, date_column, prefix = BATCH_TARGETS[record_type]
+    pandas_df = batch.to_frame()
+    ipc = frame_to_ipc(pandas_df) if _worker['keep_frames'] else None
+    if table == 'ARBORE_ORDERS' and _worker['product_index'] is not None:
+        pandas_df = _worker['product_index'].enrich(pandas_df)
+    staged_files = write_partitioned_parquet(pandas_df, date_column, prefix, _worker['temp_dir'],
+                                             _worker['granularity'])
+    return table, staged_files, ipc
+
+
+def parse_files(paths, workers, batch_size, granularity, temp_dir_name, enrich_path=None, keep_frames=False,
+                tuner=None, cache=None):
+    """Parse paths in a pool of worker processes and yield (path, result or exception) in input order.
+
+    At most 2 x workers files are in flight, so finished Parquet files do not
+    pile up in the temp directory faster than the caller uploads them. With an
+    arbore_autotune.AutoTuner, workers is the pool size, only tuner.workers
+    files are in flight and each file is parsed with the tuner's batch size
+    of the moment it was submitted. cache is the (directory, max_mb) of an
+    arbore_cache.ParseCache the workers read and fill.
+    """
+    init_args = (batch_size, granularity, temp_dir_name, enrich_path, keep_frames, cache)
+    if workers <= 1:
+        _init_worker(*init_args)
+        for path in paths:
+            try:
+                yield path, parse_file(path, tuner.batch_size if tuner else None)
+            except Exception as e:
+                yield path, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        pending = deque()
+        remaining = deque(paths)
+        while remaining or pending:
+            # top up to the current window (the tuner may have grown or shrunk it since the last file)
+            while remaining and len(pending) < (tuner.workers if tuner else 2 * workers):
+                path = remaining.popleft()
+                pending.append((path, pool.submit(parse_file, path, tuner.batch_size if tuner else None)))
+            path, future = pending.popleft()
+            try:
+                yield path, future.result()
+            except Exception as e:
+                yield path, e
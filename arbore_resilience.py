@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Arboré loader resilience helpers
+Retry with exponential backoff, a circuit breaker, and a local dead-letter directory
+so a failing PUT, ingest or INSERT does not abort a whole load.
+"""
+
+import datetime
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+
+DEAD_LETTER_DIR = "dead_letter"
+
+MAX_RETRIES = 4          # attempts after the first one
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 30.0
+
+FAILURE_THRESHOLD = 3    # consecutive calls failing all retries before the circuit opens
+RESET_TIMEOUT_SECONDS = 60.0
+
+# Errors worth retrying, matched by class name anywhere in the exception's MRO so
+# the Snowflake connector, ingest SDK and requests need not be imported here.
+# ProgrammingError, DataError, IntegrityError and the like are not: the same
+# statement with the same record fails the same way every time.
+TRANSIENT_ERROR_NAMES = {
+    'OperationalError', 'InterfaceError',                    # DB-API: connection lost, network
+    'ServiceUnavailableError', 'GatewayTimeoutError', 'BadGatewayError',
+    'InternalServerError', 'OtherHTTPRetryableError', 'RequestTimeoutError',  # snowflake.connector HTTP
+    'ConnectionError', 'TimeoutError', 'timeout', 'Timeout',  # builtins, socket (3.9), requests
+    'ChunkedEncodingError', 'ProtocolError', 'IncompleteRead',
+}
+TRANSIENT_HTTP_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Snowflake while the circuit is open"""
+
+
+def is_transient(error):
+    """True for errors a retry can fix: lost connections, timeouts, HTTP 429/5xx"""
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(getattr(error, 'response', None), 'status_code', None) or getattr(error, 'status_code', None)
+    return status in TRANSIENT_HTTP_STATUSES
+
+
+class CircuitBreaker:
+    """Stop calling a failing endpoint for a while after repeated failures.
+
+    After failure_threshold consecutive calls have exhausted their retries the
+    circuit opens and calls fail fast; once reset_timeout has elapsed a single
+    trial call is let through (half-open) while the others keep failing fast,
+    and its outcome closes or re-opens the circuit. Thread-safe: the PUT threads
+    share one breaker.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError while open; returns True when this call is the half-open trial"""
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            if self.trial_in_flight or time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"circuit open after {self.failures} consecutive failures")
+            self.trial_in_flight = True
+        logging.info("Circuit half-open, trying one call")
+        return True
+
+    def retry_after(self):
+        """Seconds until the circuit lets a trial call through (0 when closed)"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            # With a trial already in flight, check back shortly for its outcome
+            return max(remaining, 0.0) if not self.trial_in_flight else max(remaining, 1.0)
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logging.warning("Circuit closed, Snowflake calls succeed again")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+def retry_call(func, *args, description="call", breaker=None, retries=MAX_RETRIES,
+               base_delay=BASE_DELAY_SECONDS, max_delay=MAX_DELAY_SECONDS, **kwargs):
+    """Call func(*args, **kwargs), retrying transient errors with exponential backoff and jitter.
+
+    Re-raises the last error once retries are exhausted, any non-transient
+    error (see is_transient) straight away, and CircuitOpenError when the
+    breaker is open. A half-open trial call is not retried.
+    """
+    for attempt in range(retries + 1):
+        trial = breaker.before_call() if breaker is not None else False
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_transient(e):
+                # Snowflake answered: a bad statement or record says nothing about its health
+                if breaker is not None:
+                    breaker.record_success()
+                raise
+            if attempt == retries or trial:
+                # Only a call that failed every attempt counts against the breaker,
+                # so one slow moment cannot open the circuit on its own
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logging.warning(f"{description} failed ({e}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+class DeadLetterQueue:
+    """Local directory of batches that kept failing, kept for a later replay.
+
+    Staged Parquet files are moved to <directory>/<table>/ with a JSON manifest
+    next to each; single records are appended to <directory>/<name>.ndjson.
+    """
+
+    def __init__(self, directory=DEAD_LETTER_DIR):
+        self.directory = directory
+        self.files = 0
+        self.rows = 0
+        self.records = 0
+
+    def put_file(self, path, table, manifest):
+        """Move a Parquet file into the dead-letter directory with its manifest"""
+        table_dir = os.path.join(self.directory, table)
+        os.makedirs(table_dir, exist_ok=True)
+        file_name = os.path.basename(path)
+        shutil.move(path, os.path.join(table_dir, file_name))
+
+        manifest = dict(manifest, table=table, file_name=file_name,
+                        failed_at=datetime.datetime.now().isoformat(timespec='seconds'))
+        with open(os.path.join(table_dir, file_name + ".json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        self.files += 1
+        self.rows += manifest.get('rows', 0)
+        logging.warning(f"Dead-lettered {file_name} for {table}: {manifest.get('error')}")
+
+    def pending_files(self):
+        """Yield (parquet_path, manifest) for every dead-lettered file"""
+        if not os.path.isdir(self.directory):
+            return
+        for table in sorted(os.listdir(self.directory)):
+            table_dir = os.path.join(self.directory, table)
+            if not os.path.isdir(table_dir):
+                continue
+            for name in sorted(os.listdir(table_dir)):
+                if not name.endswith(".parquet.json"):
+                    continue
+                with open(os.path.join(table_dir, name), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                yield os.path.join(table_dir, manifest['file_name']), manifest
+
+    def remove_manifest(self, path):
+        """Drop the manifest of a replayed file (the loader already removed the file)"""
+        os.unlink(path + ".json")
+
+    def records_path(self, name):
+        return os.path.join(self.directory, f"{name}.ndjson")
+
+    def put_record(self, name, record, error):
+        """Append a failed record to <directory>/<name>.ndjson"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.records_path(name), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'record': record, 'error': str(error),
+                                'failed_at': datetime.datetime.now().isoformat(timespec='seconds')}) + '\n')
+        self.records += 1
+
+    def replay_records(self, name):
+        """Yield the dead-lettered records of a given name for a replay.
+
+        <name>.ndjson is first renamed to <name>.ndjson.replaying, so records
+        failing again are appended to a fresh <name>.ndjson, and the replaying
+        file is deleted only once every record has been consumed. A replay that
+        crashes or is interrupted leaves it in place and the next replay starts
+        over from it (records already re-inserted are sent again).
+        """
+        path = self.records_path(name)
+        replaying_path = path + ".replaying"
+        if os.path.exists(path):
+            if os.path.exists(replaying_path):
+                # An interrupted replay left its file: add the newer failures to it
+                with open(path, 'r', encoding='utf-8') as src, open(replaying_path, 'a', encoding='utf-8') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.unlink(path)
+            else:
+                os.replace(path, replaying_path)
+        if not os.path.exists(replaying_path):
+            return
+
+        with open(replaying_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)['record']
+        os.unlink(replaying_path)
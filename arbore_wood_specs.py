@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Arboré supplier wood specs reader
+Streams wood_specs.csv (FINAL_data_generator.py / create_csv_wood.py) in
+record batches with explicit column types, and coerces or flags the dirty
+values column-wise:
+
+- density_kg_m3 "unknown" or empty            -> NULL, FLAG_DENSITY_UNKNOWN
+- empty hardness_n                            -> NULL, FLAG_HARDNESS_MISSING
+- negative carbon storage                     -> absolute value, FLAG_CARBON_NEGATIVE
+- recyclability above 100%                    -> capped at 100, FLAG_RECYCLABILITY_CAPPED
+- certification other than FSC/PEFC/None      -> kept as sent, FLAG_CERTIFICATION_UNKNOWN
+- updated_at in any generator date format     -> DATE, FLAG_UPDATED_AT_INVALID when unparseable
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from arbore_normalize import normalize_dates
+
+# CSV header -> output column. Everything is read as text so one bad value
+# cannot abort the stream; coercion happens per batch in clean_wood_specs().
+WOOD_SPEC_COLUMNS = {
+    'region_wood': 'REGION_WOOD',
+    'wood_species': 'WOOD_SPECIES',
+    'density_kg_m3': 'DENSITY_KG_M3',
+    'hardness_n': 'HARDNESS_N',
+    'carbon_storage_kg_co2e_per_kg': 'CARBON_STORAGE_KG_CO2E_PER_KG',
+    'recyclability_rate_pct': 'RECYCLABILITY_RATE_PCT',
+    'certification': 'CERTIFICATION',
+    'origin': 'ORIGIN',
+    'updated_at': 'UPDATED_AT',
+}
+
+CERTIFICATIONS = ('FSC', 'PEFC', 'NONE')
+
+FLAG_COLUMNS = (
+    'FLAG_DENSITY_UNKNOWN',
+    'FLAG_HARDNESS_MISSING',
+    'FLAG_CARBON_NEGATIVE',
+    'FLAG_RECYCLABILITY_CAPPED',
+    'FLAG_CERTIFICATION_UNKNOWN',
+    'FLAG_UPDATED_AT_INVALID',
+)
+
+READ_BLOCK_BYTES = 1 << 20
+
+
+def open_wood_specs(path, block_size=READ_BLOCK_BYTES):
+    """Streaming reader over the CSV, yielding Arrow record batches of about block_size bytes"""
+    return pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=block_size),
+        convert_options=pv.ConvertOptions(
+            include_columns=list(WOOD_SPEC_COLUMNS),
+            column_types={name: pa.string() for name in WOOD_SPEC_COLUMNS},
+            strings_can_be_null=False,
+        ),
+    )
+
+
+def iter_wood_spec_frames(path, batch_size):
+    """Yield cleaned DataFrames of about batch_size rows, reading the file in a single pass"""
+    pending, pending_rows = [], 0
+    for record_batch in open_wood_specs(path):
+        pending.append(record_batch)
+        pending_rows += record_batch.num_rows
+        if pending_rows >= batch_size:
+            yield clean_wood_specs(pa.Table.from_batches(pending).to_pandas())
+            pending, pending_rows = [], 0
+    if pending_rows:
+        yield clean_wood_specs(pa.Table.from_batches(pending).to_pandas())
+
+
+def _numbers(values):
+    return pd.to_numeric(values.str.strip(), errors='coerce')
+
+
+def clean_wood_specs(df):
+    """Typed wood specs with the Snowflake column names and one boolean column per flag"""
+    density = _numbers(df['density_kg_m3'])
+    hardness = _numbers(df['hardness_n'])
+    carbon = _numbers(df['carbon_storage_kg_co2e_per_kg'])
+    recyclability = _numbers(df['recyclability_rate_pct'])
+    certification = df['certification'].str.strip()
+    updated_at = normalize_dates(df['updated_at'])
+    origin = df['origin'].str.strip()
+
+    return pd.DataFrame({
+        'REGION_WOOD': df['region_wood'].str.strip(),
+        'WOOD_SPECIES': df['wood_species'].str.strip(),
+        'DENSITY_KG_M3': density,
+        'HARDNESS_N': hardness,
+        'CARBON_STORAGE_KG_CO2E_PER_KG': carbon.abs(),
+        'RECYCLABILITY_RATE_PCT': recyclability.clip(upper=100),
+        'CERTIFICATION': certification,
+        'ORIGIN': origin.mask(origin == ''),
+        'UPDATED_AT': updated_at.dt.date,
+        'FLAG_DENSITY_UNKNOWN': density.isna(),
+        'FLAG_HARDNESS_MISSING': hardness.isna(),
+        'FLAG_CARBON_NEGATIVE': carbon < 0,
+        'FLAG_RECYCLABILITY_CAPPED': recyclability > 100,
+        'FLAG_CERTIFICATION_UNKNOWN': ~certification.str.upper().isin(CERTIFICATIONS),
+        'FLAG_UPDATED_AT_INVALID': updated_at.isna(),
+    })
+
+
+def count_flags(df, counts):
+    """Add the number of flagged rows per flag column to counts"""
+    for column in FLAG_COLUMNS:
+        counts[column] = counts.get(column, 0) + int(df[column].sum())
+    return counts
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Batch buffer memory benchmark
+Compares bytes per buffered record for a list of parsed dicts (previous loader
+representation) and the columnar buffers in arbore_batches.py.
+
+Usage: python benchmarks/bench_batch_memory.py [orders.json] [warranty_claims.json]
+"""
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arbore_batches import new_claims_batch, new_orders_batch
+
+
+def measure(build):
+    """Return bytes still allocated after build() (the buffer it returns is kept alive)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    buffer = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del buffer
+    return after - before
+
+
+def bench_file(filepath, new_batch):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    # Re-decode from text inside the measurement so both buffers own their strings
+    lines = [json.dumps(record) for record in records]
+
+    def build_dicts():
+        return [json.loads(line) for line in lines]
+
+    def build_columnar():
+        batch = new_batch()
+        for line in lines:
+            batch.append(json.loads(line))
+        return batch
+
+    dict_bytes = measure(build_dicts)
+    columnar_bytes = measure(build_columnar)
+    count = len(lines)
+
+    print(f"{os.path.basename(filepath)} ({count} records)")
+    print(f"  list of dicts : {dict_bytes / count:8.1f} bytes/record")
+    print(f"  columnar      : {columnar_bytes / count:8.1f} bytes/record")
+    print(f"  reduction     : {dict_bytes / max(columnar_bytes, 1):8.1f}x")
+
+
+if __name__ == "__main__":
+    orders_path = sys.argv[1] if len(sys.argv) > 1 else "orders.json"
+    claims_path = sys.argv[2] if len(sys.argv) > 2 else "warranty_claims.json"
+    bench_file(orders_path, new_orders_batch)
+    bench_file(claims_path, new_claims_batch)
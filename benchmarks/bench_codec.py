@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+JSON codec micro-benchmark
+Times the JSON hot paths on a real orders file with the standard library
+(previous code) and with arbore_codec.py (orjson when installed):
+
+- decoding the whole file (both loaders)
+- decoding NDJSON line by line (--stdin, --watch, replay feeds)
+- the quantity VARIANT text built for every order
+- writing the file (FINAL_data_generator.write_json)
+
+Usage: python benchmarks/bench_codec.py [orders.json] [repeats]
+"""
+
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import arbore_codec
+
+
+def best_of(repeats, func):
+    """Fastest of repeats runs, in seconds"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    filepath = sys.argv[1] if len(sys.argv) > 1 else "orders.json"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    records = json.loads(raw)
+    lines = [json.dumps(record) for record in records]
+    quantities = [record.get('quantity') for record in records]
+
+    cases = [
+        ("decode file",
+         lambda: json.loads(raw),
+         lambda: arbore_codec.loads(raw)),
+        ("decode NDJSON lines",
+         lambda: [json.loads(line) for line in lines],
+         lambda: [arbore_codec.loads(line) for line in lines]),
+        ("quantity VARIANT",
+         lambda: [json.dumps(quantity) for quantity in quantities],
+         lambda: [arbore_codec.encode_variant(quantity) for quantity in quantities]),
+        ("write JSON array",
+         lambda: json.dump(records, io.StringIO(), indent=2),
+         lambda: arbore_codec.dump_records(records, io.StringIO())),
+    ]
+
+    print(f"{os.path.basename(filepath)}: {len(records)} records, {len(raw):,} bytes, "
+          f"codec backend {arbore_codec.BACKEND}, best of {repeats}")
+    print(f"  {'':<20} {'stdlib json':>12} {'arbore_codec':>13} {'speedup':>8}")
+    for label, baseline, codec in cases:
+        before = best_of(repeats, baseline)
+        after = best_of(repeats, codec)
+        print(f"  {label:<20} {before * 1000:9.1f} ms {after * 1000:10.1f} ms {before / max(after, 1e-9):7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Loader peak memory benchmark
+Runs the real py_snowpipe_arbore.py load of one file into a throwaway local
+DuckDB sink and reports wall time and peak RSS of the loader process, once per
+batch size. Unlike bench_batch_memory.py (buffers alone), this includes
+reading and decoding the input file.
+
+Usage: python benchmarks/bench_loader_memory.py [orders.json] [batch_size ...]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_load(filepath, batch_size):
+    """(seconds, peak RSS in bytes) of one load in a fresh process"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        sink = f"duckdb:{os.path.join(work_dir, 'bench.duckdb')}"
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, "py_snowpipe_arbore.py"),
+                                    os.path.abspath(filepath), str(batch_size), "--sink", sink],
+                                   cwd=work_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = process.stderr.read()
+        # wait4 gives the usage of this child alone (RUSAGE_CHILDREN is a max over all of them)
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = status
+        seconds = time.perf_counter() - started
+    if status != 0:
+        print(stderr.decode('utf-8', 'replace')[-2000:], file=sys.stderr)
+        sys.exit(f"❌ Load of {filepath} failed")
+    return seconds, usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def main():
+    filepath = sys.argv[1] if len(sys.argv) > 1 else "orders.json"
+    batch_sizes = [int(arg) for arg in sys.argv[2:]] or [5000, 50000]
+
+    print(f"{os.path.basename(filepath)}: {os.path.getsize(filepath):,} bytes, DuckDB sink")
+    for batch_size in batch_sizes:
+        seconds, peak = run_load(filepath, batch_size)
+        print(f"  batch size {batch_size:>7}: {seconds:6.1f} s  peak RSS {peak / 1024 / 1024:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Parallel parse scaling benchmark
+Splits an orders file into daily-sized files and times the worker side of
+py_snowpipe_arbore.py <dir> (JSON decode, columnar batches, partitioned
+Parquet) with 1, 2, 4... workers, without uploading anything.
+
+Usage: python benchmarks/bench_parallel_parse.py [orders.json] [files] [copies]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arbore_parallel import parse_files
+
+BATCH_SIZE = 50000
+
+
+def split_input(filepath, files, copies, directory):
+    """Write copies x the input records spread over files JSON array files"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        records = json.load(f) * copies
+    per_file = -(-len(records) // files)
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"orders_{i:04d}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(records[i * per_file:(i + 1) * per_file], f)
+        paths.append(path)
+    return paths, len(records)
+
+
+def run(paths, workers):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        started = time.perf_counter()
+        for path, result in parse_files(paths, workers, BATCH_SIZE, 'month', temp_dir):
+            if isinstance(result, Exception):
+                raise result
+            for _, staged_files, _ in result['batches']:
+                for _, _, out_path, _ in staged_files:
+                    os.unlink(out_path)
+        return time.perf_counter() - started
+
+
+def main():
+    filepath = sys.argv[1] if len(sys.argv) > 1 else "orders.json"
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    copies = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, cpus} | {n for n in (2, 4, 8, 16, 32) if n < cpus})
+    with tempfile.TemporaryDirectory() as input_dir:
+        paths, records = split_input(filepath, files, copies, input_dir)
+        print(f"{records} records in {files} files, {cpus} CPUs")
+
+        baseline = None
+        for workers in worker_counts:
+            elapsed = run(paths, workers)
+            baseline = baseline or elapsed
+            print(f"  {workers:3d} workers: {elapsed:6.2f}s  {records / elapsed:10,.0f} records/s  "
+                  f"speedup {baseline / elapsed:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
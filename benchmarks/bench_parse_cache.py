@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Parse cache benchmark
+Times getting an orders/claims file into loader batches (pandas DataFrames of
+batch_size rows) three ways: decoding the JSON into columnar batches as the
+loaders do without --cache, a cache miss (decode + store the Arrow IPC
+files), and a cache hit (memory-map the stored columns).
+
+Usage: python benchmarks/bench_parse_cache.py [orders.json] [batch_size] [repeats]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arbore_cache import ParseCache, iter_frames
+from arbore_parallel import read_records
+
+
+def decode(filepath, batch_size):
+    from arbore_batches import new_claims_batch, new_orders_batch
+    from py_snowpipe_arbore import detect_record_type
+
+    batches = {'order': new_orders_batch(), 'claim': new_claims_batch()}
+    rows = 0
+    for record in read_records(filepath):
+        batch = batches.get(detect_record_type(record))
+        if batch is None:
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            rows += len(batch.to_frame())
+            batch.clear()
+    return rows + sum(len(batch.to_frame()) for batch in batches.values() if batch)
+
+
+def from_cache(cache, filepath, batch_size):
+    tables, _ = cache.load(filepath)
+    return sum(len(pandas_df) for table in tables.values() for pandas_df in iter_frames(table, batch_size))
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    rows = func(*args)
+    return time.perf_counter() - started, rows
+
+
+def main():
+    filepath = sys.argv[1] if len(sys.argv) > 1 else "orders.json"
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    decode(filepath, batch_size)  # warm up imports
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ParseCache(cache_dir)
+        miss, rows = timed(from_cache, cache, filepath, batch_size)
+        plain = min(timed(decode, filepath, batch_size)[0] for _ in range(repeats))
+        hit = min(timed(from_cache, cache, filepath, batch_size)[0] for _ in range(repeats))
+
+    print(f"{os.path.basename(filepath)}: {rows} records, {os.path.getsize(filepath):,} bytes, "
+          f"batch size {batch_size}, best of {repeats}")
+    print(f"  decode JSON    {plain * 1000:9.1f} ms  {rows / plain:12,.0f} records/s")
+    print(f"  cache miss     {miss * 1000:9.1f} ms  {rows / miss:12,.0f} records/s")
+    print(f"  cache hit      {hit * 1000:9.1f} ms  {rows / hit:12,.0f} records/s  {plain / max(hit, 1e-9):5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+CLI cold-start benchmark
+Runs each entry point on a path that does no real work (usage/help) under
+`python -X importtime`, and prints the wall time plus the top-level imports
+that cost the most.
+
+check_snowpipe_status.py runs its real main() with an invalid PRIVATE_KEY: it
+imports everything a cron run imports (the Snowflake connector and
+cryptography included) and fails parsing the key, before any network call.
+
+Usage: python benchmarks/bench_startup.py [runs] [top_n]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Makes connect_snow() fail right after its imports; set variables win over .env
+FAILED_CONNECTION_ENV = {"PRIVATE_KEY": "invalid", "SNOWFLAKE_ACCOUNT": "invalid", "SNOWFLAKE_USER": "invalid"}
+
+# (label, arguments after `python -X importtime`, extra environment)
+COMMANDS = [
+    ("py_snowpipe_arbore.py --help", ["py_snowpipe_arbore.py", "--help"], {}),
+    ("py_insert_arbore.py (usage)", ["py_insert_arbore.py"], {}),
+    ("check_snowpipe_status.py (connection fails)", ["check_snowpipe_status.py"], FAILED_CONNECTION_ENV),
+]
+
+
+def parse_importtime(stderr):
+    """Return {top-level module: cumulative microseconds} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if name.startswith("  "):
+            continue  # imported by another module, already inside its parent's cumulative time
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_once(args, env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=REPO_DIR,
+                            capture_output=True, text=True, env=dict(os.environ, **env))
+    return time.perf_counter() - started, parse_importtime(result.stderr)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    print(f"Cold start over {runs} runs (median), Python {sys.version.split()[0]}")
+    for label, args, env in COMMANDS:
+        samples = [run_once(args, env) for _ in range(runs)]
+        wall = statistics.median(seconds for seconds, _ in samples)
+        modules = samples[-1][1]
+        imports_ms = sum(modules.values()) / 1000
+
+        print(f"\n{label}: {wall * 1000:.0f} ms wall, {imports_ms:.0f} ms in imports")
+        for name, cumulative in sorted(modules.items(), key=lambda item: -item[1])[:top_n]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
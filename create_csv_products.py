@@ -7,6 +7,9 @@ Generates d_watch_product.csv based on product_id.csv and wood_specs.csv
 """
 
 import csv
+import datetime
+import hashlib
+import json
 import os
 import sys
 from pathlib import Path
@@ -18,6 +21,8 @@ PRODUCT_IDS_PATH = SCRIPT_DIR / "product_id.csv"
 WOOD_SPECS_PATH = PROJECT_ROOT / "data_out" / "supplier" / "wood_specs.csv"
 OUTPUT_DIR = PROJECT_ROOT / "data_out" / "dims"
 OUTPUT_PATH = OUTPUT_DIR / "d_watch_product.csv"
+DELTA_PATH = OUTPUT_DIR / "d_watch_product_delta.csv"
+KEY_MAP_PATH = OUTPUT_DIR / "product_key_map.json"
 
 # Ensure output directory exists
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -38,6 +43,12 @@ PRICE_RANGES = {
     "Arboré Essentiel": (120, 250)
 }
 
+PRODUCT_FIELDS = ['product_id', 'product_name', 'wood_species', 'region_wood', 'category', 'price_eur']
+SCD2_FIELDS = ['valid_from', 'valid_to', 'is_current']
+
+# Product columns compared between runs; a change in any of them updates the product
+PRODUCT_FINGERPRINT_FIELDS = ['product_name', 'wood_species', 'region_wood', 'category', 'price_eur']
+
 # Exotic/dense woods that get a price premium
 PREMIUM_WOODS = [
     "Teak", "Ebony", "Rosewood", "Jarrah", "Wenge", "Mahogany", 
@@ -109,32 +120,160 @@ def generate_product_data(product_ids, wood_data):
                 print("Warning: Ran out of product IDs")
                 break
                 
-            product_id = product_ids[id_index]
-            wood_species = wood['wood_species']
-            region_wood = wood['region_wood']
-            
-            # Generate product name: Arboré <Category> <Wood_Species>
-            product_name = f"{category} {wood_species}"
-            
-            # Calculate price
-            price_eur = calculate_price(category, wood_species)
-            
-            products.append({
-                'product_id': product_id,
-                'product_name': product_name,
-                'wood_species': wood_species,
-                'region_wood': region_wood,
-                'category': category,
-                'price_eur': price_eur
-            })
+            # Product name is Arboré <Category> <Wood_Species>, price from tier and wood
+            products.append(build_product(product_ids[id_index], category, wood))
             
             id_index += 1
     
     return products
 
+def build_product(product_id, category, wood):
+    """Build one product row for a wood species and category"""
+    return {
+        'product_id': product_id,
+        'product_name': f"{category} {wood['wood_species']}",
+        'wood_species': wood['wood_species'],
+        'region_wood': wood['region_wood'],
+        'category': category,
+        'price_eur': calculate_price(category, wood['wood_species'])
+    }
+
+def product_fingerprint(product):
+    """Hash the product columns tracked for changes"""
+    payload = "|".join(str(product.get(field, '')) for field in PRODUCT_FINGERPRINT_FIELDS)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def product_key(wood_species, region_wood, category):
+    """Natural key of a product in the key map"""
+    return f"{wood_species}|{region_wood}|{category}"
+
+def distinct_woods(wood_data):
+    """Unique (wood_species, region_wood) pairs in file order.
+
+    The generator's supplier feed has one row per supplier, so the same species
+    and region repeat; each pair makes one set of products.
+    """
+    seen = set()
+    woods = []
+    for wood in wood_data:
+        pair = (wood['wood_species'], wood['region_wood'])
+        if pair not in seen:
+            seen.add(pair)
+            woods.append(wood)
+    return woods
+
+def load_key_map():
+    """Load the persistent product key map, seeding it from an existing dimension file"""
+    if KEY_MAP_PATH.exists():
+        with open(KEY_MAP_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    key_map = {}
+    if OUTPUT_PATH.exists():
+        # First incremental run: keep the IDs already published downstream
+        with open(OUTPUT_PATH, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                product = {field: row[field] for field in PRODUCT_FIELDS}
+                key_map.setdefault(product_key(row['wood_species'], row['region_wood'], row['category']), {
+                    'product_id': row['product_id'],
+                    'fingerprint': product_fingerprint(product),
+                    'product': product,
+                    'valid_from': None,
+                    'is_current': True
+                })
+        print(f"Seeded product key map with {len(key_map)} products from {OUTPUT_PATH}")
+    return key_map
+
+def save_key_map(key_map):
+    """Persist the product key map next to the dimension file"""
+    with open(KEY_MAP_PATH, 'w', encoding='utf-8') as f:
+        json.dump(key_map, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+def generate_product_delta(product_ids, wood_data, key_map, today, scd2=False):
+    """Compare wood specs against the key map and return (current products, delta rows).
+
+    Existing products keep their ID; new species/region/category combinations take
+    the next unused ID from product_id.csv; combinations missing from wood_specs.csv
+    are retired. Delta rows carry a change_type of INSERT, UPDATE or RETIRE. With
+    scd2, an UPDATE also emits the row closing the previous version (is_current
+    False, valid_to today) ahead of the new one.
+    """
+    used_ids = {entry['product_id'] for entry in key_map.values()}
+    free_ids = iter([pid for pid in product_ids if pid not in used_ids])
+    next_fallback = len(product_ids) + 1
+
+    products = []
+    delta = []
+    seen_keys = set()
+
+    for wood in distinct_woods(wood_data):
+        for category in CATEGORIES:
+            key = product_key(wood['wood_species'], wood['region_wood'], category)
+            seen_keys.add(key)
+            entry = key_map.get(key)
+
+            if entry is None:
+                product_id = next(free_ids, None)
+                if product_id is None:
+                    print("Warning: Ran out of product IDs")
+                    product_id = f"P{next_fallback:04d}"
+                    next_fallback += 1
+                entry = key_map[key] = {'product_id': product_id, 'fingerprint': None,
+                                        'valid_from': None, 'is_current': False}
+
+            product = build_product(entry['product_id'], category, wood)
+            fingerprint = product_fingerprint(product)
+            products.append(product)
+
+            if not entry['is_current']:
+                change_type = 'INSERT'
+            elif entry['fingerprint'] != fingerprint:
+                change_type = 'UPDATE'
+                if scd2:
+                    delta.append(closing_row(key, entry, 'UPDATE', today))
+            else:
+                continue
+
+            entry.update({'fingerprint': fingerprint, 'product': product,
+                          'valid_from': today, 'is_current': True})
+            delta.append(dict(product, change_type=change_type,
+                              valid_from=today, valid_to='', is_current=True))
+
+    for key, entry in sorted(key_map.items()):
+        if key in seen_keys or not entry['is_current']:
+            continue
+        delta.append(closing_row(key, entry, 'RETIRE', today))
+        entry['is_current'] = False
+
+    return products, delta
+
+def closing_row(key, entry, change_type, today):
+    """Delta row ending the current version of a key map entry"""
+    wood_species, region_wood, category = key.split('|', 2)
+    previous = entry.get('product') or {
+        'product_name': f"{category} {wood_species}", 'wood_species': wood_species,
+        'region_wood': region_wood, 'category': category, 'price_eur': ''
+    }
+    return dict(previous, product_id=entry['product_id'], change_type=change_type,
+                valid_from=entry['valid_from'] or '', valid_to=today, is_current=False)
+
+def write_delta(delta, scd2=False):
+    """Write changed products to d_watch_product_delta.csv"""
+    fieldnames = PRODUCT_FIELDS + ['change_type'] + (SCD2_FIELDS if scd2 else [])
+
+    try:
+        with open(DELTA_PATH, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(delta)
+        print(f"Successfully wrote {len(delta)} changed products to {DELTA_PATH}")
+    except Exception as e:
+        print(f"Error writing delta: {e}")
+        sys.exit(1)
+
 def write_output(products):
     """Write products to d_watch_product.csv"""
-    fieldnames = ['product_id', 'product_name', 'wood_species', 'region_wood', 'category', 'price_eur']
+    fieldnames = PRODUCT_FIELDS
     
     try:
         with open(OUTPUT_PATH, 'w', newline='', encoding='utf-8') as f:
@@ -149,6 +288,8 @@ def write_output(products):
 def main():
     """Main function to generate product data"""
     print("Arboré Product Table Generator")
+    incremental = '--incremental' in sys.argv[1:]
+    scd2 = '--scd2' in sys.argv[1:]
     
     # Load product IDs and wood specs
     product_ids = load_product_ids()
@@ -156,11 +297,25 @@ def main():
     
     print(f"Loaded {len(product_ids)} product IDs and {len(wood_data)} wood species")
     
-    # Generate product data
-    products = generate_product_data(product_ids, wood_data)
-    
-    # Write output
+    if not incremental:
+        # Full rebuild: IDs assigned positionally
+        products = generate_product_data(product_ids, wood_data)
+        write_output(products)
+        return
+
+    # Incremental: stable IDs from the key map, only changed products in the delta
+    today = datetime.date.today().isoformat()
+    key_map = load_key_map()
+    products, delta = generate_product_delta(product_ids, wood_data, key_map, today, scd2)
+
+    # The rows closing the previous version of an UPDATE are not counted again
+    counts = {change: sum(1 for row in delta if row['change_type'] == change and (row['is_current'] or change == 'RETIRE'))
+              for change in ('INSERT', 'UPDATE', 'RETIRE')}
+    print(f"Delta: {counts['INSERT']} inserted, {counts['UPDATE']} changed, {counts['RETIRE']} retired")
+
     write_output(products)
+    write_delta(delta, scd2)
+    save_key_map(key_map)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Arboré feed data-quality profiler
+One bounded-memory pass over incoming orders/claims files (JSON arrays or
+NDJSON, orders and claims can be mixed) that predicts what the silver
+procedures will do with them, before anything is loaded:
+
+- null and blank rate per field
+- date-format mix per date column (DD/MM vs MM/DD ambiguity included)
+- textual quantities ("two") and IDs missing their O/R prefix
+- severity and return reason spelling variants
+- approximate distinct IDs (HyperLogLog) and duplicates the MERGE will collapse
+- predicted silver_orders_rejects / F_ORDER_RETURN_REJECTS counts per reason
+
+Records are profiled in chunks of --chunk records, so memory does not grow
+with the file. With --max-reject-pct the exit code is 1 when the predicted
+reject rate of orders or claims is above that percentage, so the profiler
+can gate a load. With --cache, files already in the parse cache of the
+loaders (arbore_cache.py) are read from their memory-mapped columns instead
+of being decoded again, and new ones are added to it.
+
+Usage: python profile_data_quality.py <file|dir|-> [...] [--chunk N] [--max-reject-pct P] [--cache]
+"""
+
+import difflib
+import functools
+import os
+import re
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from arbore_batches import CLAIM_COLUMNS, ORDER_COLUMNS
+from arbore_codec import JSONDecodeError, iter_json_array, loads
+from arbore_gold import HyperLogLog, hash_values
+from arbore_normalize import (RETURN_REASONS, SILVER_DATE_FORMATS, decode_under_warranty, normalize_dates,
+                              normalize_severity, parse_quantity)
+
+DEFAULT_CHUNK = 50000
+DISTINCT_PRECISION = 14  # 16k registers per field, ~0.8% standard error
+MAX_VARIANTS = 200       # spellings kept per field, the rest are counted as "(other)"
+TOP_SPELLINGS = 5        # spellings printed per canonical value
+FEED_EXTENSIONS = ('.json', '.ndjson', '.jsonl')
+
+# Per record kind: expected ID prefixes, date columns, columns with spelling variants
+FEEDS = {
+    'orders': {
+        'fields': [field for _, field, _ in ORDER_COLUMNS],
+        'prefixes': {'order_id': 'O'},
+        'dates': ['order_date'],
+        'distinct': ['order_id', 'customer_id', 'product_id'],
+        'variants': [],
+        'key': 'order_id',
+    },
+    'claims': {
+        'fields': [field for _, field, _ in CLAIM_COLUMNS],
+        'prefixes': {'claim_id': 'R', 'order_id': 'O'},
+        'dates': ['order_date', 'return_date'],
+        'distinct': ['claim_id', 'order_id', 'product_id'],
+        'variants': ['severity', 'return_reason'],
+        'key': 'claim_id',
+    },
+}
+
+_SLASH_DATE = re.compile(r'^(\d{1,2})/(\d{1,2})/\d{4}$')
+_DATE_SHAPES = [
+    ('YYYY-MM-DDTHH:MM:SSZ', re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z$')),
+    ('YYYY-MM-DD', re.compile(r'^\d{4}-\d{2}-\d{2}$')),
+    ('DD-MM-YYYY', re.compile(r'^\d{1,2}-\d{1,2}-\d{4}$')),
+]
+
+
+def iter_records(path, stats):
+    """Yield the records of a JSON array or NDJSON file ('-' reads NDJSON from stdin)"""
+    if path == '-':
+        yield from _iter_lines(sys.stdin, stats)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        if head.startswith('['):
+            yield from iter_json_array(f)
+        else:
+            yield from _iter_lines(f, stats)
+
+
+def _iter_lines(f, stats):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield loads(line)
+        except JSONDecodeError:
+            stats['unparseable_lines'] += 1
+
+
+@functools.lru_cache(maxsize=65536)
+def date_shape(text):
+    """Name of the layout of a date string; NN/NN/YYYY is split by which part can be the month"""
+    text = text.strip()
+    match = _SLASH_DATE.match(text)
+    if match:
+        first, second = int(match.group(1)), int(match.group(2))
+        if first > 12:
+            return 'DD/MM/YYYY'
+        if second > 12:
+            return 'MM/DD/YYYY'
+        return 'NN/NN/YYYY (ambiguous)'
+    for name, pattern in _DATE_SHAPES:
+        if pattern.match(text):
+            return name
+    return 'other'
+
+
+@functools.lru_cache(maxsize=4096)
+def canonical_reason(text):
+    """Closest known return reason for a spelling, '?' when nothing is close"""
+    cleaned = text.strip().lower()
+    match = difflib.get_close_matches(cleaned, RETURN_REASONS, n=1, cutoff=0.6)
+    return match[0] if match else '?'
+
+
+class FeedProfile:
+    """Running data-quality counters for one record kind (orders or claims)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.spec = FEEDS[kind]
+        self.records = 0
+        self.nulls = Counter()
+        self.blanks = Counter()
+        self.date_shapes = {field: Counter() for field in self.spec['dates']}
+        self.textual_quantity = 0
+        self.negative_quantity = 0
+        self.missing_prefix = Counter()
+        self.variants = {field: Counter() for field in self.spec['variants']}
+        self.overflow = Counter()
+        self.distinct = {field: HyperLogLog(DISTINCT_PRECISION) for field in self.spec['distinct']}
+        self.valid_keys = HyperLogLog(DISTINCT_PRECISION)
+        self.valid = 0
+        self.rejects = Counter()
+
+    def add(self, records):
+        """Profile a chunk of record dicts"""
+        df = pd.DataFrame.from_records(records, columns=self.spec['fields'])
+        text = {field: df[field].astype("string").str.strip() for field in self.spec['fields']}
+        self.records += len(df)
+
+        for field, values in text.items():
+            self.nulls[field] += int(values.isna().sum())
+            self.blanks[field] += int((values == '').sum())
+
+        for field in self.spec['dates']:
+            codes, uniques = pd.factorize(text[field])
+            shapes = np.array([date_shape(value) for value in uniques] + ['null'], dtype=object)
+            self.date_shapes[field].update(Counter(shapes[codes].tolist()))
+
+        for field, prefix in self.spec['prefixes'].items():
+            values = text[field]
+            self.missing_prefix[field] += int((values.notna() & ~values.str.startswith(prefix).fillna(False)).sum())
+
+        for field in self.spec['variants']:
+            self._add_variants(field, df[field])
+
+        for field, sketch in self.distinct.items():
+            values = text[field].dropna()
+            sketch.add_hashes(hash_values(values[values != ''].to_numpy(dtype=object)))
+
+        reasons = self._reject_reasons(df, text)
+        valid = reasons.isna().to_numpy()
+        self.valid += int(valid.sum())
+        self.rejects.update(reasons.dropna().tolist())
+        self.valid_keys.add_hashes(hash_values(text[self.spec['key']][valid].to_numpy(dtype=object)))
+
+    def _add_variants(self, field, values):
+        counts = self.variants[field]
+        counts.update(values.dropna().astype(str).value_counts().to_dict())
+        if len(counts) > MAX_VARIANTS:
+            kept = dict(counts.most_common(MAX_VARIANTS))
+            self.overflow[field] += sum(counts.values()) - sum(kept.values())
+            self.variants[field] = Counter(kept)
+
+    def _reject_reasons(self, df, text):
+        """First failing silver validation rule per row (NA when the row passes), in procedure order"""
+        if self.kind == 'orders':
+            quantity = parse_quantity(df['quantity'])
+            text_quantity = df['quantity'].notna() & quantity.isna()
+            self.textual_quantity += int(text_quantity.sum())
+            self.negative_quantity += int((quantity < 0).sum())
+            checks = [
+                ('order_id is NULL', text['order_id'].isna()),
+                ('quantity not numeric', quantity.isna()),
+                ('quantity negative', quantity < 0),
+                ('order_date invalid', normalize_dates(df['order_date'], SILVER_DATE_FORMATS).isna()),
+            ]
+        else:
+            order_date = normalize_dates(df['order_date'], SILVER_DATE_FORMATS)
+            return_date = normalize_dates(df['return_date'], SILVER_DATE_FORMATS)
+            checks = [
+                ('claim_id is NULL', text['claim_id'].isna()),
+                ('order_id is NULL', text['order_id'].isna()),
+                ('product_id is NULL', text['product_id'].isna()),
+                ('order_date invalid', order_date.isna()),
+                ('return_date invalid', return_date.isna()),
+                ('return_date before order_date', return_date < order_date),
+                ('under_warranty undecodable', decode_under_warranty(df['under_warranty']).isna()),
+            ]
+        conditions = [condition.fillna(False).to_numpy(dtype=bool) for _, condition in checks]
+        reasons = np.select(conditions, [reason for reason, _ in checks], default='')
+        return pd.Series(reasons, index=df.index).replace('', pd.NA)
+
+    @property
+    def rejected(self):
+        return sum(self.rejects.values())
+
+    @property
+    def reject_pct(self):
+        return 100 * self.rejected / self.records if self.records else 0.0
+
+    def print_report(self):
+        records = self.records
+        pct = lambda count: f"{100 * count / records:5.1f}%"
+        print(f"\n{self.kind.upper()} ({records:,} records)")
+
+        print(f"  {'field':<16} {'null':>6} {'blank':>6}")
+        for field in self.spec['fields']:
+            print(f"  {field:<16} {pct(self.nulls[field])} {pct(self.blanks[field])}")
+
+        for field, shapes in self.date_shapes.items():
+            print(f"  {field} formats:")
+            for shape, count in shapes.most_common():
+                print(f"    {shape:<24} {pct(count)}  {count:,}")
+
+        if self.kind == 'orders':
+            print(f"  quantity: {pct(self.textual_quantity)} textual, {pct(self.negative_quantity)} negative")
+        for field, prefix in self.spec['prefixes'].items():
+            print(f"  {field} without '{prefix}' prefix: {pct(self.missing_prefix[field])}")
+
+        for field, counts in self.variants.items():
+            print(f"  {field} spellings ({len(counts)} distinct):")
+            canonical = normalize_severity if field == 'severity' else None
+            groups = {}
+            for value, count in counts.items():
+                key = canonical(pd.Series([value])).iloc[0] if canonical else canonical_reason(value)
+                groups.setdefault('(blank)' if pd.isna(key) else key, []).append((value, count))
+            for key, spellings in sorted(groups.items(), key=lambda item: -sum(c for _, c in item[1])):
+                spellings.sort(key=lambda spelling: -spelling[1])
+                listed = ", ".join(f"{value!r} {count:,}" for value, count in spellings[:TOP_SPELLINGS])
+                if len(spellings) > TOP_SPELLINGS:
+                    rest = spellings[TOP_SPELLINGS:]
+                    listed += f", +{len(rest)} more ({sum(count for _, count in rest):,} rows)"
+                print(f"    {key:<10} {listed}")
+            if self.overflow[field]:
+                print(f"    (other)    {self.overflow[field]:,} rows in rarer spellings")
+
+        distinct = ", ".join(f"{field} ~{sketch.estimate():,.0f}" for field, sketch in self.distinct.items())
+        print(f"  approx. distinct: {distinct}")
+        duplicates = max(self.valid - round(self.valid_keys.estimate()), 0)
+        print(f"  predicted duplicates collapsed by MERGE: ~{duplicates:,}")
+
+        print(f"  predicted silver rejects: {self.rejected:,} ({self.reject_pct:.1f}%)")
+        for reason, count in self.rejects.most_common():
+            print(f"    {reason:<32} {count:,}")
+
+
+def expand_paths(paths):
+    """Files to profile: directories are expanded to their .json/.ndjson/.jsonl files"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(FEED_EXTENSIONS):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def profile_files(paths, chunk_size=DEFAULT_CHUNK, cache=None):
+    """Profile every record of the given files, chunk by chunk; returns (profiles, stats)"""
+    profiles = {kind: FeedProfile(kind) for kind in FEEDS}
+    pending = {kind: [] for kind in FEEDS}
+    stats = Counter()
+
+    for path in expand_paths(paths):
+        stats['files'] += 1
+        cached = None
+        if cache is not None and path != '-':
+            try:
+                cached = cache.load(path)
+            except ValueError:
+                pass  # unparseable lines: the streaming reader below skips and counts them
+        # A file with records that are neither orders nor claims is read again: they are profiled as orders
+        if cached is not None and not cached[1]:
+            from arbore_cache import iter_records as iter_cached_records
+
+            for record_type, table in cached[0].items():
+                records = iter_cached_records(record_type, table, chunk_size)
+                for chunk in iter(lambda: list(islice(records, chunk_size)), []):
+                    profiles['orders' if record_type == 'order' else 'claims'].add(chunk)
+            continue
+        for record in iter_records(path, stats):
+            if not isinstance(record, dict):
+                stats['not_objects'] += 1
+                continue
+            kind = 'claims' if 'claim_id' in record else 'orders'
+            pending[kind].append(record)
+            if len(pending[kind]) >= chunk_size:
+                profiles[kind].add(pending[kind])
+                pending[kind] = []
+
+    for kind, records in pending.items():
+        if records:
+            profiles[kind].add(records)
+    return profiles, stats
+
+
+def print_usage():
+    print("Usage: python profile_data_quality.py <file|dir|-> [...] [--chunk N] [--max-reject-pct P] [--cache]")
+    print("Examples:")
+    print("  python profile_data_quality.py data_out/orders/orders.json")
+    print("  python profile_data_quality.py data_out/ --max-reject-pct 20")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print_usage()
+        sys.exit(0 if args else 1)
+
+    paths, chunk_size, max_reject_pct, cache = [], DEFAULT_CHUNK, None, None
+    while args:
+        arg = args.pop(0)
+        if arg == '--chunk' and args:
+            chunk_size = int(args.pop(0))
+        elif arg == '--max-reject-pct' and args:
+            max_reject_pct = float(args.pop(0))
+        elif arg == '--cache':
+            from arbore_cache import ParseCache
+            cache = ParseCache()
+        else:
+            paths.append(arg)
+
+    started = time.perf_counter()
+    try:
+        profiles, stats = profile_files(paths, chunk_size, cache)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    if cache is not None:
+        cache.print_summary()
+
+    total = sum(profile.records for profile in profiles.values())
+    print(f"📋 Profiled {total:,} records from {stats['files']} file(s) in {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} records/s)")
+    if stats['unparseable_lines'] or stats['not_objects']:
+        print(f"⚠️  Skipped {stats['unparseable_lines']} unparseable lines, {stats['not_objects']} non-object values")
+    for profile in profiles.values():
+        if profile.records:
+            profile.print_report()
+
+    if max_reject_pct is not None:
+        over = [profile for profile in profiles.values() if profile.records and profile.reject_pct > max_reject_pct]
+        for profile in over:
+            print(f"\n❌ {profile.kind}: predicted reject rate {profile.reject_pct:.1f}% is above {max_reject_pct:g}%")
+        if over:
+            sys.exit(1)
+        print(f"\n✅ Predicted reject rates are within {max_reject_pct:g}%")
+
+
+if __name__ == "__main__":
+    main()